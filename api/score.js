@@ -1,6 +1,10 @@
 // api/score.js
 const Busboy = require("busboy");
-const pdfParse = require("pdf-parse");
+const { createScoreCache } = require("../lib/score_cache");
+const { buildResumePrompt, extractResumeText, resumeScoreKey, resumeTextKey, scoreResume } = require("../lib/resume_scoring");
+
+// Same PDF + same prompt/schema/model => cached text and score (see lib/score_cache.js).
+const cache = createScoreCache();
 
 module.exports = async (req, res) => {
   if (req.method !== "POST") {
@@ -69,86 +73,46 @@ module.exports = async (req, res) => {
   }
 
   // ---- Extract PDF text (v1) ----
-  let resumeText = "";
-  try {
-    const parsed = await pdfParse(resumeBuf);
-    resumeText = (parsed.text || "").trim();
-  } catch (e) {
-    res.statusCode = 400;
-    return res.end("Could not read PDF text");
+  const tKey = resumeTextKey(resumeBuf);
+  let resumeText = await cacheOrNull(cache.getText(tKey));
+  if (resumeText === null) {
+    try {
+      resumeText = await extractResumeText(resumeBuf);
+    } catch (e) {
+      res.statusCode = 400;
+      return res.end("Could not read PDF text");
+    }
+    await cacheOrNull(cache.setText(tKey, resumeText));
   }
 
-  // Optional: light redaction of obvious PII before sending to the model
-  // (You can disable if you want full fidelity.)
-  resumeText = redactPII(resumeText);
+  const prompt = buildResumePrompt({
+    resumeText,
+    resumeName,
+    context: {
+      // You can pass any fields from the form here if you want:
+      // e.g., fields.gpa, fields.calc_completed, fields.upper_courses, etc.
+    }
+  });
 
-  // Keep within a sane limit (resumes are short, but guard anyway)
-  resumeText = clipText(resumeText, 22000);
+  const sKey = resumeScoreKey(prompt);
+  const hit = await cacheOrNull(cache.getScore(sKey));
+  if (hit !== null) {
+    res.setHeader("Content-Type", "application/json");
+    res.setHeader("X-Score-Cache", "hit");
+    return res.status(200).end(JSON.stringify(hit));
+  }
 
   // ---- Call OpenAI (server-side) ----
   try {
     const OpenAI = (await import("openai")).default;
     const client = new OpenAI({ apiKey: process.env.OPENAI_API_KEY });
 
-    const schema = {
-      name: "ResumeScore",
-      schema: {
-        type: "object",
-        additionalProperties: false,
-        properties: {
-          resume_score: { type: "number", minimum: 0, maximum: 10 },
-          subscores: {
-            type: "object",
-            additionalProperties: false,
-            properties: {
-              math_engagement: { type: "number", minimum: 0, maximum: 10 },
-              research_exposition: { type: "number", minimum: 0, maximum: 10 },
-              leadership_service: { type: "number", minimum: 0, maximum: 10 },
-              initiative_trajectory: { type: "number", minimum: 0, maximum: 10 }
-            },
-            required: ["math_engagement", "research_exposition", "leadership_service", "initiative_trajectory"]
-          },
-          strengths: { type: "array", items: { type: "string" }, maxItems: 5 },
-          risks_or_gaps: { type: "array", items: { type: "string" }, maxItems: 5 },
-          confidence: { type: "string", enum: ["low", "medium", "high"] }
-        },
-        required: ["resume_score", "subscores", "strengths", "risks_or_gaps", "confidence"]
-      }
-    };
-
-    const prompt = buildResumePrompt({
-      resumeText,
-      resumeName,
-      context: {
-        // You can pass any fields from the form here if you want:
-        // e.g., fields.gpa, fields.calc_completed, fields.upper_courses, etc.
-      }
-    });
-
-    // Responses API (recommended)  [oai_citation:3‡OpenAI Platform](https://platform.openai.com/docs/guides/migrate-to-responses)
-    // Structured Outputs for strict JSON schema  [oai_citation:4‡OpenAI Platform](https://platform.openai.com/docs/guides/structured-outputs)
-    const response = await client.responses.create({
-      model: "gpt-4o-2024-08-06",
-      input: prompt,
-      text: {
-        format: {
-          type: "json_schema",
-          strict: true,
-          ...schema
-        }
-      }
-    });
+    const json = await scoreResume(client, prompt);
 
-    const outText = response.output_text || "";
-    const json = JSON.parse(outText);
-
-    // Round to 1 decimal for display consistency
-    json.resume_score = Math.round(json.resume_score * 10) / 10;
-    for (const k of Object.keys(json.subscores || {})) {
-      json.subscores[k] = Math.round(json.subscores[k] * 10) / 10;
-    }
+    await cacheOrNull(cache.setScore(sKey, json));
 
     res.setHeader("Content-Type", "application/json");
+    res.setHeader("X-Score-Cache", "miss");
     return res.status(200).end(JSON.stringify(json));
   } catch (e) {
     res.statusCode = 500;
@@ -157,49 +121,12 @@ module.exports = async (req, res) => {
 };
 
 // ---------- helpers ----------
-function clipText(s, maxChars) {
-  if (!s) return "";
-  if (s.length <= maxChars) return s;
-  // Keep start + end (end often contains skills/keywords)
-  const head = s.slice(0, Math.floor(maxChars * 0.75));
-  const tail = s.slice(-Math.floor(maxChars * 0.25));
-  return `${head}\n\n[... clipped ...]\n\n${tail}`;
-}
-
-function redactPII(s) {
-  if (!s) return "";
-  return s
-    // emails
-    .replace(/[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}/gi, "[REDACTED_EMAIL]")
-    // phone numbers (rough)
-    .replace(/(\+?\d{1,2}\s*)?(\(?\d{3}\)?[\s.-]?)\d{3}[\s.-]?\d{4}/g, "[REDACTED_PHONE]")
-    // addresses (very rough heuristic line-based)
-    .replace(/^\s*\d{1,6}\s+.*(Street|St|Avenue|Ave|Road|Rd|Drive|Dr|Boulevard|Blvd|Lane|Ln)\b.*$/gim, "[REDACTED_ADDRESS]");
+// The cache is an optimization: a read-only or full disk must not fail the request.
+async function cacheOrNull(p) {
+  try {
+    const v = await p;
+    return v === undefined ? null : v;
+  } catch {
+    return null;
+  }
 }
-
-function buildResumePrompt({ resumeText, resumeName }) {
-  return [
-    {
-      role: "system",
-      content:
-        "You are an admissions scoring assistant for a Pi Mu Epsilon chapter. " +
-        "Score the RESUME ONLY. Use the rubric. Be fair across backgrounds. " +
-        "Do not reward prestige names; reward evidence of mathematical engagement, rigor, initiative, and contribution. " +
-        "Do not penalize for formatting or unconventional paths. " +
-        "Return ONLY valid JSON matching the provided schema."
-    },
-    {
-      role: "user",
-      content:
-        `Resume filename: ${resumeName || "resume.pdf"}\n\n` +
-        "Rubric (each 0–10):\n" +
-        "- math_engagement: math coursework depth, problem-solving culture, TA/tutoring, seminars, competitions, reading groups\n" +
-        "- research_exposition: research experience, papers/posters, expository writing, projects with mathematical substance\n" +
-        "- leadership_service: organizing, outreach, mentoring, chapter/community involvement\n" +
-        "- initiative_trajectory: self-started work, sustained commitment, upward trajectory\n\n" +
-        "Overall resume_score (0–10) should reflect a holistic view.\n\n" +
-        "RESUME TEXT:\n" +
-        resumeText
-    }
-  ];
-}
\ No newline at end of file
@@ -0,0 +1,159 @@
+// lib/resume_scoring.js
+// The resume rubric, prompt, schema and text pipeline shared by api/score.js (one upload
+// per request) and tools/batch_score.js (a whole pool offline). Edit the rubric here;
+// the score cache keys on the built prompt, so stale cached scores are never reused.
+
+const pdfParse = require("pdf-parse");
+const { scoreKey, textKey } = require("./score_cache");
+
+const MODEL = "gpt-4o-2024-08-06";
+
+const RESUME_SCHEMA = {
+  name: "ResumeScore",
+  schema: {
+    type: "object",
+    additionalProperties: false,
+    properties: {
+      resume_score: { type: "number", minimum: 0, maximum: 10 },
+      subscores: {
+        type: "object",
+        additionalProperties: false,
+        properties: {
+          math_engagement: { type: "number", minimum: 0, maximum: 10 },
+          research_exposition: { type: "number", minimum: 0, maximum: 10 },
+          leadership_service: { type: "number", minimum: 0, maximum: 10 },
+          initiative_trajectory: { type: "number", minimum: 0, maximum: 10 }
+        },
+        required: ["math_engagement", "research_exposition", "leadership_service", "initiative_trajectory"]
+      },
+      strengths: { type: "array", items: { type: "string" }, maxItems: 5 },
+      risks_or_gaps: { type: "array", items: { type: "string" }, maxItems: 5 },
+      confidence: { type: "string", enum: ["low", "medium", "high"] }
+    },
+    required: ["resume_score", "subscores", "strengths", "risks_or_gaps", "confidence"]
+  }
+};
+
+const MAX_RESUME_CHARS = 22000;
+// Bump when extractResumeText, redactPII or clipText change what text comes out of a PDF.
+const TEXT_PIPELINE_VERSION = 1;
+
+// PDF bytes -> the text the model sees: extracted, lightly redacted, clipped.
+async function extractResumeText(buf) {
+  const parsed = await pdfParse(buf);
+  let text = (parsed.text || "").trim();
+
+  // Optional: light redaction of obvious PII before sending to the model
+  // (You can disable if you want full fidelity.)
+  text = redactPII(text);
+
+  // Keep within a sane limit (resumes are short, but guard anyway)
+  return clipText(text, MAX_RESUME_CHARS);
+}
+
+// Text-cache key for a PDF: its bytes plus everything that shapes the extracted text.
+function resumeTextKey(pdfBuf) {
+  return textKey(pdfBuf, { text: TEXT_PIPELINE_VERSION, maxChars: MAX_RESUME_CHARS });
+}
+
+function resumeScoreKey(prompt) {
+  return scoreKey({ model: MODEL, schema: RESUME_SCHEMA, prompt });
+}
+
+// The score key of an empty resume under the current text pipeline: it changes exactly
+// when the model, schema, rubric prompt or text pipeline do, without reading any PDF.
+function resumeRubricKey() {
+  return scoreKey({
+    model: MODEL,
+    schema: RESUME_SCHEMA,
+    prompt: [TEXT_PIPELINE_VERSION, MAX_RESUME_CHARS, buildResumePrompt({ resumeText: "" })]
+  });
+}
+
+// One Responses API call with Structured Outputs; returns the rounded score JSON.
+async function scoreResume(client, prompt) {
+  // Responses API (recommended)  [oai_citation:3‡OpenAI Platform](https://platform.openai.com/docs/guides/migrate-to-responses)
+  // Structured Outputs for strict JSON schema  [oai_citation:4‡OpenAI Platform](https://platform.openai.com/docs/guides/structured-outputs)
+  const response = await client.responses.create({
+    model: MODEL,
+    input: prompt,
+    text: {
+      format: {
+        type: "json_schema",
+        strict: true,
+        ...RESUME_SCHEMA
+      }
+    }
+  });
+
+  const json = JSON.parse(response.output_text || "");
+
+  // Round to 1 decimal for display consistency
+  json.resume_score = Math.round(json.resume_score * 10) / 10;
+  for (const k of Object.keys(json.subscores || {})) {
+    json.subscores[k] = Math.round(json.subscores[k] * 10) / 10;
+  }
+  return json;
+}
+
+function clipText(s, maxChars) {
+  if (!s) return "";
+  if (s.length <= maxChars) return s;
+  // Keep start + end (end often contains skills/keywords)
+  const head = s.slice(0, Math.floor(maxChars * 0.75));
+  const tail = s.slice(-Math.floor(maxChars * 0.25));
+  return `${head}\n\n[... clipped ...]\n\n${tail}`;
+}
+
+function redactPII(s) {
+  if (!s) return "";
+  return s
+    // emails
+    .replace(/[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}/gi, "[REDACTED_EMAIL]")
+    // phone numbers (rough)
+    .replace(/(\+?\d{1,2}\s*)?(\(?\d{3}\)?[\s.-]?)\d{3}[\s.-]?\d{4}/g, "[REDACTED_PHONE]")
+    // addresses (very rough heuristic line-based)
+    .replace(/^\s*\d{1,6}\s+.*(Street|St|Avenue|Ave|Road|Rd|Drive|Dr|Boulevard|Blvd|Lane|Ln)\b.*$/gim, "[REDACTED_ADDRESS]");
+}
+
+function buildResumePrompt({ resumeText, resumeName }) {
+  return [
+    {
+      role: "system",
+      content:
+        "You are an admissions scoring assistant for a Pi Mu Epsilon chapter. " +
+        "Score the RESUME ONLY. Use the rubric. Be fair across backgrounds. " +
+        "Do not reward prestige names; reward evidence of mathematical engagement, rigor, initiative, and contribution. " +
+        "Do not penalize for formatting or unconventional paths. " +
+        "Return ONLY valid JSON matching the provided schema."
+    },
+    {
+      role: "user",
+      content:
+        `Resume filename: ${resumeName || "resume.pdf"}\n\n` +
+        "Rubric (each 0–10):\n" +
+        "- math_engagement: math coursework depth, problem-solving culture, TA/tutoring, seminars, competitions, reading groups\n" +
+        "- research_exposition: research experience, papers/posters, expository writing, projects with mathematical substance\n" +
+        "- leadership_service: organizing, outreach, mentoring, chapter/community involvement\n" +
+        "- initiative_trajectory: self-started work, sustained commitment, upward trajectory\n\n" +
+        "Overall resume_score (0–10) should reflect a holistic view.\n\n" +
+        "RESUME TEXT:\n" +
+        resumeText
+    }
+  ];
+}
+
+module.exports = {
+  MAX_RESUME_CHARS,
+  MODEL,
+  RESUME_SCHEMA,
+  TEXT_PIPELINE_VERSION,
+  buildResumePrompt,
+  clipText,
+  extractResumeText,
+  redactPII,
+  resumeRubricKey,
+  resumeScoreKey,
+  resumeTextKey,
+  scoreResume
+};
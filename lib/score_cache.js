@@ -0,0 +1,132 @@
+// lib/score_cache.js
+// Content-addressed file cache for api/score.js, so re-uploading the same resume skips
+// pdfParse and the model call.
+//
+// Two namespaces:
+//   text/   extracted + redacted + clipped resume text, keyed by sha256 of the cache
+//           version, the caller's text-pipeline version and the PDF bytes, so a change
+//           to redaction or clipping does not serve text produced by the old pipeline
+//   score/  the final score JSON, keyed by sha256 of everything the model sees:
+//           cache version, model name, schema and the full prompt (which embeds the
+//           resume text and filename). Editing the rubric, the schema or the model
+//           therefore changes the key, so no version has to be bumped by hand.
+//
+// Entries are one JSON file each, written to a temp name and renamed, so concurrent
+// requests never read half an entry. A hit refreshes the file's mtime, and once a
+// namespace holds more than maxEntries files the least recently used are deleted.
+// Entries older than ttlMs are treated as misses and removed. On Vercel only os.tmpdir()
+// is writable and it lives as long as a warm instance; set SCORE_CACHE_DIR elsewhere.
+
+const crypto = require("crypto");
+const fs = require("fs");
+const os = require("os");
+const path = require("path");
+
+// Bump when the post-processing of model output (e.g. rounding) or the entry layout changes.
+const CACHE_VERSION = 1;
+
+const DEFAULTS = {
+  dir: process.env.SCORE_CACHE_DIR || path.join(os.tmpdir(), "pme-score-cache"),
+  ttlMs: Number(process.env.SCORE_CACHE_TTL_MS) || 30 * 24 * 3600 * 1000, // 30 days
+  maxEntries: Number(process.env.SCORE_CACHE_MAX_ENTRIES) || 2000
+};
+
+function sha256(data) {
+  return crypto.createHash("sha256").update(data).digest("hex");
+}
+
+// pipeline: anything JSON-serializable that identifies how text is extracted from the
+// PDF (see resumeTextKey in lib/resume_scoring.js).
+function textKey(pdfBuf, pipeline = null) {
+  return crypto.createHash("sha256")
+    .update(JSON.stringify([CACHE_VERSION, pipeline]))
+    .update("\0")
+    .update(pdfBuf)
+    .digest("hex");
+}
+
+function scoreKey({ model, schema, prompt }) {
+  return sha256(JSON.stringify([CACHE_VERSION, model, schema, prompt]));
+}
+
+function createScoreCache(opts = {}) {
+  const { dir, ttlMs, maxEntries } = { ...DEFAULTS, ...opts };
+  const writesSinceSweep = {};
+
+  function fileFor(ns, key) {
+    if (!/^[0-9a-f]{64}$/.test(key)) throw new Error(`Bad cache key: ${key}`);
+    return path.join(dir, ns, `${key}.json`);
+  }
+
+  async function get(ns, key) {
+    const file = fileFor(ns, key);
+    let entry;
+    try {
+      entry = JSON.parse(await fs.promises.readFile(file, "utf8"));
+    } catch {
+      return null; // missing or unreadable: a miss
+    }
+    if (!entry || entry.key !== key || Date.now() - entry.created_at > ttlMs) {
+      await fs.promises.rm(file, { force: true });
+      return null;
+    }
+    const now = new Date();
+    await fs.promises.utimes(file, now, now).catch(() => {});
+    return entry.value;
+  }
+
+  async function set(ns, key, value) {
+    const file = fileFor(ns, key);
+    await fs.promises.mkdir(path.dirname(file), { recursive: true });
+    const tmp = `${file}.${process.pid}.${crypto.randomBytes(4).toString("hex")}.tmp`;
+    await fs.promises.writeFile(tmp, JSON.stringify({ key, created_at: Date.now(), value }));
+    await fs.promises.rename(tmp, file);
+
+    // Sweep every so often rather than listing the directory on every write.
+    writesSinceSweep[ns] = (writesSinceSweep[ns] || 0) + 1;
+    if (writesSinceSweep[ns] >= Math.max(1, Math.floor(maxEntries / 10))) {
+      writesSinceSweep[ns] = 0;
+      await evict(ns);
+    }
+  }
+
+  async function evict(ns) {
+    const nsDir = path.join(dir, ns);
+    let names;
+    try {
+      names = (await fs.promises.readdir(nsDir)).filter((n) => n.endsWith(".json"));
+    } catch {
+      return 0;
+    }
+    const now = Date.now();
+    const stats = [];
+    for (const name of names) {
+      try {
+        const st = await fs.promises.stat(path.join(nsDir, name));
+        stats.push({ name, mtime: st.mtimeMs });
+      } catch {
+        // removed concurrently
+      }
+    }
+    stats.sort((a, b) => b.mtime - a.mtime); // most recently used first
+    let removed = 0;
+    for (let i = 0; i < stats.length; i++) {
+      if (i >= maxEntries || now - stats[i].mtime > ttlMs) {
+        await fs.promises.rm(path.join(nsDir, stats[i].name), { force: true });
+        removed++;
+      }
+    }
+    return removed;
+  }
+
+  return {
+    dir,
+    getText: (key) => get("text", key),
+    setText: (key, text) => set("text", key, text),
+    getScore: (key) => get("score", key),
+    setScore: (key, json) => set("score", key, json),
+    evict
+  };
+}
+
+module.exports = { CACHE_VERSION, createScoreCache, scoreKey, sha256, textKey };
@@ -1,12 +1,15 @@
 // rank.js
 // Loads a trained pairwise ranker (rank_model.json) and produces:
 // - raw score = w · x + bias
-// - percentile-mapped 0–10 score within a pool (optional)
+// - percentile-mapped 0–10 score within a pool (optional), either the pool's raw
+//   scores or a precomputed rank_calibration.json (binary search, same result)
+// - for model bundles, the 0–10 score from the bundled calibration with no pool at all
 
 (function (global) {
   "use strict";
 
   const MODEL_URL = "./model/rank_model.json";
+  const CALIBRATION_URL = "./model/rank_calibration.json"; // tools/score_pool.py --calibration-out
 
   function dot(w, x) {
     let s = 0;
@@ -19,21 +22,118 @@
     return Math.round(x * 10) / 10;
   }
 
-  function percentileScore(raw, rawAll) {
-    if (!rawAll || rawAll.length === 0) return 5.0;
+  // Number of entries in sorted (ascending) that are < x.
+  function lowerBound(sorted, x) {
+    let lo = 0;
+    let hi = sorted.length;
+    while (lo < hi) {
+      const mid = (lo + hi) >>> 1;
+      if (sorted[mid] < x) lo = mid + 1;
+      else hi = mid;
+    }
+    return lo;
+  }
+
+  // Sorted copies of pool arrays already seen, so scoring many applicants against the
+  // same pool sorts it once. Pools are treated as immutable once passed in.
+  const sortedPools = new WeakMap();
+
+  function sortedPool(rawAll) {
+    let sorted = sortedPools.get(rawAll);
+    if (!sorted) {
+      sorted = [...rawAll].sort((a, b) => a - b);
+      sortedPools.set(rawAll, sorted);
+    }
+    return sorted;
+  }
 
-    const sorted = [...rawAll].sort((a, b) => a - b);
+  function isCalibrationTable(pool) {
+    return !!pool && !Array.isArray(pool) && Array.isArray(pool.values);
+  }
 
-    // upper-bound index: count strictly below raw
-    let idx = 0;
-    while (idx < sorted.length && sorted[idx] < raw) idx++;
+  // Validate a rank_calibration.json object and precompute its prefix counts.
+  function prepareCalibration(table) {
+    if (!isCalibrationTable(table) || table.format !== "pme-calibration") {
+      throw new Error("Invalid calibration JSON (missing values)");
+    }
+    const values = table.values.map(Number);
+    const weights = Array.isArray(table.weights) ? table.weights.map(Number) : null;
+    if (weights && weights.length !== values.length) throw new Error("Calibration weights/values length mismatch");
+    const below = new Array(values.length + 1);
+    below[0] = 0;
+    for (let i = 0; i < values.length; i++) {
+      if (!Number.isFinite(values[i]) || (i > 0 && values[i] <= values[i - 1])) {
+        throw new Error(`Calibration values must be finite and increasing (index ${i})`);
+      }
+      below[i + 1] = below[i] + (weights ? weights[i] : 1);
+    }
+    return { ...table, values, below, n: below[values.length] };
+  }
 
-    const rank = idx;
-    const pct = sorted.length <= 1 ? 0.5 : rank / (sorted.length - 1);
+  // rawAll is an array of pool raw scores or a calibration table (loadCalibration);
+  // both give round1(10 * (count strictly below raw) / (n - 1)).
+  function percentileScore(raw, rawAll) {
+    let n;
+    let rank;
+    if (isCalibrationTable(rawAll)) {
+      const table = rawAll.below ? rawAll : prepareCalibration(rawAll);
+      n = table.n;
+      rank = table.below[lowerBound(table.values, raw)];
+    } else {
+      if (!rawAll || rawAll.length === 0) return 5.0;
+      const sorted = sortedPool(rawAll);
+      n = sorted.length;
+      rank = lowerBound(sorted, raw);
+    }
+    if (n === 0) return 5.0;
 
+    const pct = n <= 1 ? 0.5 : rank / (n - 1);
     return round1(pct * 10);
   }
 
+  // Resolves to null when no calibration table is deployed.
+  async function loadCalibration(url = CALIBRATION_URL) {
+    const r = await fetch(url, { cache: "no-store" });
+    if (r.status === 404) return null;
+    if (!r.ok) throw new Error(`Could not load calibration: ${r.status}`);
+    const table = prepareCalibration(await r.json());
+    // Raw scores here are w · x + bias; the table must have been built the same way.
+    if (Boolean(table.includes_bias) !== true) {
+      throw new Error(`Calibration includes_bias=${Boolean(table.includes_bias)} does not match this rank.js; rebuild with score_pool.py --use-bias`);
+    }
+    const fvLocal = global.PMEFeatures ? global.PMEFeatures.FEATURE_VERSION : null;
+    if (fvLocal != null && table.feature_version != null && Number(table.feature_version) !== Number(fvLocal)) {
+      throw new Error(`Calibration/feature version mismatch: calibration=${table.feature_version}, features=${fvLocal}`);
+    }
+    return table;
+  }
+
+  // Model bundles (train_ranker.py, bundle_version 1) carry the feature schema and a
+  // calibration table; validate them once here so scoring needs no pool upload.
+  const BUNDLE_VERSION = 1;
+
+  function assertBundle(model) {
+    if (model.bundle_version == null) return model;
+    if (Number(model.bundle_version) > BUNDLE_VERSION) {
+      throw new Error(`Unsupported model bundle_version ${model.bundle_version} (this rank.js reads ${BUNDLE_VERSION})`);
+    }
+    const dim = model.weights.length;
+    for (const key of ["feature_names", "feature_mean", "feature_std"]) {
+      if (model[key] != null && (!Array.isArray(model[key]) || model[key].length !== dim)) {
+        throw new Error(`Model ${key} must have ${dim} entries`);
+      }
+    }
+    const local = global.PMEFeatures;
+    if (local && Array.isArray(model.feature_names) && Number(model.feature_version) === Number(local.FEATURE_VERSION)) {
+      const i = model.feature_names.findIndex((name, k) => name !== local.FEATURE_NAMES[k]);
+      if (i >= 0 || local.FEATURE_NAMES.length !== dim) {
+        throw new Error(`Model feature_names do not match features.js (first difference at index ${i >= 0 ? i : dim})`);
+      }
+    }
+    if (model.calibration != null) model.calibration = prepareCalibration(model.calibration);
+    return model;
+  }
+
   function assertModelCompatible(model) {
     if (!model || !Array.isArray(model.weights)) {
       throw new Error("Invalid model JSON (missing weights array)");
@@ -59,7 +159,7 @@
     // bias optional
     model.bias = Number.isFinite(Number(model.bias)) ? Number(model.bias) : 0.0;
 
-    return model;
+    return assertBundle(model);
   }
 
   async function loadModel(url = MODEL_URL) {
@@ -84,15 +184,23 @@
   }
 
   // returns { raw, score_0_10 } using a pool of raw scores (optional)
+  // Without a pool, a bundled model's calibration table is used (else the score is 5.0).
   function scoreWithPool(model, features, poolRawScores) {
     const raw = scoreRaw(model, features);
+    if (!poolRawScores && model.calibration) {
+      // The table was built from w · x (+ bias only if includes_bias), computed the same way here.
+      const key = dot(model.weights, features) + (model.calibration.includes_bias ? model.bias || 0.0 : 0.0);
+      return { raw, score_0_10: percentileScore(key, model.calibration) };
+    }
     const score_0_10 = percentileScore(raw, poolRawScores || [raw]);
     return { raw, score_0_10 };
   }
 
   global.PMERanker = {
     MODEL_URL,
+    CALIBRATION_URL,
     loadModel,
+    loadCalibration,
     scoreRaw,
     scoreWithPool,
     percentileScore
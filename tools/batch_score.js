@@ -0,0 +1,381 @@
+#!/usr/bin/env node
+// tools/batch_score.js
+// Offline resume scoring for a whole pool, e.g. after a rubric change in
+// lib/resume_scoring.js. It uses the same prompt, schema and rounding as api/score.js.
+//
+//   node tools/batch_score.js --dir resumes/ --out resume_scores.jsonl
+//   node tools/batch_score.js --manifest resumes.csv --out resume_scores.jsonl --concurrency 8
+//   node tools/batch_score.js --dir resumes/ --out s.jsonl --base-url http://localhost:8787/v1   # stub model
+//
+// Input:  --dir: every *.pdf, applicant id = file name without .pdf.
+//         --manifest: CSV with id,path columns (paths relative to the manifest), or JSONL
+//         of {"id", "path"}.
+// Output: one JSONL line per applicant, appended as soon as it finishes:
+//           {"id", "file", "pdf_sha256", "rubric", "score_key", "status": "ok", "score": {...},
+//            "cached", "attempts", "ms"}
+//         or status "error" with "error". Re-running with the same --out skips ids that
+//         already have an ok line with the current rubric key (resumeRubricKey) and
+//         scores the rest, so an interrupted run resumes where it stopped and a run after
+//         a rubric edit rescores everyone. The newest line for an id wins.
+//
+// PDF text extraction runs in --workers worker threads; a worker that crashes fails only
+// the resume it was on and is replaced. At most --concurrency model calls are in flight.
+// Rate limits (429), 5xx and network errors are retried up to --retries times with
+// exponential backoff plus jitter, honoring Retry-After. Results also go through
+// lib/score_cache.js (--cache-dir, or SCORE_CACHE_DIR / the OS temp dir), so a re-run
+// with an unchanged rubric needs no model calls.
+
+const fs = require("fs");
+const os = require("os");
+const path = require("path");
+const { Worker, isMainThread, parentPort } = require("worker_threads");
+
+const { createScoreCache, sha256 } = require("../lib/score_cache");
+const {
+  MODEL,
+  buildResumePrompt,
+  extractResumeText,
+  resumeRubricKey,
+  resumeScoreKey,
+  scoreResume
+} = require("../lib/resume_scoring");
+
+if (!isMainThread) {
+  // Extraction worker: {seq, file} -> {seq, sha, text} or {seq, error}.
+  parentPort.on("message", async ({ seq, file }) => {
+    try {
+      const buf = await fs.promises.readFile(file);
+      const text = await extractResumeText(buf);
+      parentPort.postMessage({ seq, sha: sha256(buf), text });
+    } catch (e) {
+      parentPort.postMessage({ seq, error: (e && e.message) || String(e) });
+    }
+  });
+  return;
+}
+
+function parseArgs(argv) {
+  const args = {
+    dir: "",
+    manifest: "",
+    out: "",
+    concurrency: 4,
+    workers: Math.max(1, Math.min(os.cpus().length, 4)),
+    retries: 5,
+    baseUrl: "",
+    cacheDir: "",
+    noCache: false,
+    limit: 0
+  };
+  const flags = {
+    "--dir": "dir",
+    "--manifest": "manifest",
+    "--out": "out",
+    "--concurrency": "concurrency",
+    "--workers": "workers",
+    "--retries": "retries",
+    "--base-url": "baseUrl",
+    "--cache-dir": "cacheDir",
+    "--limit": "limit"
+  };
+  for (let i = 0; i < argv.length; i++) {
+    const a = argv[i];
+    if (a === "--no-cache") {
+      args.noCache = true;
+    } else if (a === "-h" || a === "--help") {
+      console.log(fs.readFileSync(__filename, "utf8").split("\n").slice(1, 26).join("\n"));
+      process.exit(0);
+    } else if (flags[a]) {
+      if (i + 1 >= argv.length) fail(`${a} needs a value`);
+      const key = flags[a];
+      const v = argv[++i];
+      args[key] = typeof args[key] === "number" ? Number(v) : v;
+      if (typeof args[key] === "number" && !Number.isFinite(args[key])) fail(`${a} must be a number`);
+    } else {
+      fail(`Unknown argument: ${a}`);
+    }
+  }
+  if (!args.out) fail("--out is required");
+  if (!args.dir === !args.manifest) fail("Give exactly one of --dir or --manifest");
+  args.concurrency = Math.max(1, Math.floor(args.concurrency));
+  args.workers = Math.max(1, Math.floor(args.workers));
+  args.retries = Math.max(0, Math.floor(args.retries));
+  return args;
+}
+
+function fail(msg) {
+  console.error(msg);
+  process.exit(2);
+}
+
+function splitCsvLine(line) {
+  const out = [];
+  let cur = "";
+  let q = false;
+  for (let i = 0; i < line.length; i++) {
+    const c = line[i];
+    if (q) {
+      if (c === '"' && line[i + 1] === '"') { cur += '"'; i++; }
+      else if (c === '"') q = false;
+      else cur += c;
+    } else if (c === '"') q = true;
+    else if (c === ",") { out.push(cur); cur = ""; }
+    else cur += c;
+  }
+  out.push(cur);
+  return out.map((s) => s.trim());
+}
+
+function loadJobs(args) {
+  if (args.dir) {
+    return fs.readdirSync(args.dir)
+      .filter((n) => n.toLowerCase().endsWith(".pdf"))
+      .sort()
+      .map((n) => ({ id: n.slice(0, -4), file: path.join(args.dir, n) }));
+  }
+  const base = path.dirname(args.manifest);
+  const lines = fs.readFileSync(args.manifest, "utf8").split(/\r?\n/).filter((l) => l.trim());
+  const jobs = [];
+  if (args.manifest.toLowerCase().endsWith(".csv")) {
+    const head = splitCsvLine(lines[0] || "");
+    const ci = head.indexOf("id");
+    const cp = head.indexOf("path");
+    if (ci < 0 || cp < 0) fail(`${args.manifest}: needs id and path columns`);
+    for (const line of lines.slice(1)) {
+      const cols = splitCsvLine(line);
+      if (cols[ci] && cols[cp]) jobs.push({ id: cols[ci], file: path.resolve(base, cols[cp]) });
+    }
+  } else {
+    for (const line of lines) {
+      const obj = JSON.parse(line);
+      if (obj && obj.id && obj.path) jobs.push({ id: String(obj.id), file: path.resolve(base, obj.path) });
+    }
+  }
+  return jobs;
+}
+
+// Ids whose latest ok line in --out was scored under rubric (a torn last line from a
+// crash is ignored).
+function loadDone(out, rubric) {
+  const done = new Set();
+  if (!fs.existsSync(out)) return done;
+  for (const line of fs.readFileSync(out, "utf8").split("\n")) {
+    if (!line.trim()) continue;
+    try {
+      const r = JSON.parse(line);
+      if (r && r.status === "ok" && r.rubric === rubric) done.add(r.id);
+      else if (r && r.status === "ok") done.delete(r.id);
+    } catch {
+      // partial line
+    }
+  }
+  return done;
+}
+
+// True if file exists and its last byte is not a newline (a crash mid-write).
+function endsMidLine(file) {
+  let fd;
+  try {
+    fd = fs.openSync(file, "r");
+  } catch {
+    return false;
+  }
+  try {
+    const size = fs.fstatSync(fd).size;
+    if (!size) return false;
+    const b = Buffer.alloc(1);
+    fs.readSync(fd, b, 0, 1, size - 1);
+    return b[0] !== 0x0a;
+  } finally {
+    fs.closeSync(fd);
+  }
+}
+
+function createExtractPool(n) {
+  const workers = new Set();
+  const idle = [];
+  const waiting = [];
+  const pending = new Map(); // seq -> {resolve, reject}
+  const running = new Map(); // worker -> seq of the job it is on
+  let respawns = Math.max(10, 10 * n); // stop replacing workers that die on their own
+  let closed = false;
+  let seq = 0;
+
+  function spawn() {
+    const w = new Worker(__filename);
+    w.on("message", (msg) => {
+      const p = pending.get(msg.seq);
+      if (!p) return;
+      pending.delete(msg.seq);
+      running.delete(w);
+      release(w);
+      if (msg.error) p.reject(new Error(msg.error));
+      else p.resolve(msg);
+    });
+    w.on("error", (e) => retire(w, e));
+    w.on("exit", (code) => retire(w, new Error(`Extraction worker exited (code ${code})`)));
+    workers.add(w);
+    return w;
+  }
+
+  // A dead worker fails only the job it was running; a fresh one takes its place.
+  function retire(w, err) {
+    if (!workers.delete(w)) return; // "error" is followed by "exit"
+    const i = idle.indexOf(w);
+    if (i >= 0) idle.splice(i, 1);
+    const s = running.get(w);
+    const p = pending.get(s);
+    running.delete(w);
+    if (p) {
+      pending.delete(s);
+      p.reject(err);
+    }
+    if (closed) return;
+    if (respawns-- > 0) {
+      release(spawn());
+    } else if (!workers.size) {
+      for (const next of waiting.splice(0)) next.reject(err);
+    }
+  }
+
+  function release(w) {
+    const next = waiting.shift();
+    if (next) next.resolve(w);
+    else idle.push(w);
+  }
+
+  async function extract(file) {
+    if (!workers.size) throw new Error("No extraction workers left");
+    const w = idle.pop() || (await new Promise((resolve, reject) => waiting.push({ resolve, reject })));
+    const s = ++seq;
+    return new Promise((resolve, reject) => {
+      pending.set(s, { resolve, reject });
+      running.set(w, s);
+      w.postMessage({ seq: s, file });
+    });
+  }
+
+  for (let i = 0; i < n; i++) idle.push(spawn());
+
+  return {
+    extract,
+    close: () => {
+      closed = true;
+      return Promise.all([...workers].map((w) => w.terminate()));
+    }
+  };
+}
+
+function isRetryable(e) {
+  const status = e && e.status;
+  if (status === 408 || status === 409 || status === 429) return true;
+  if (typeof status === "number") return status >= 500;
+  // No HTTP status: connection reset, timeout, DNS, ...
+  return !(e instanceof SyntaxError);
+}
+
+function retryAfterMs(e) {
+  const h = e && e.headers;
+  const v = h && (typeof h.get === "function" ? h.get("retry-after") : h["retry-after"]);
+  const s = Number(v);
+  return Number.isFinite(s) && s > 0 ? s * 1000 : 0;
+}
+
+const sleep = (ms) => new Promise((r) => setTimeout(r, ms));
+
+async function withRetry(fn, retries) {
+  for (let attempt = 1; ; attempt++) {
+    try {
+      return { value: await fn(), attempts: attempt };
+    } catch (e) {
+      if (attempt > retries || !isRetryable(e)) {
+        e.attempts = attempt;
+        throw e;
+      }
+      const backoff = Math.min(60000, 1000 * 2 ** (attempt - 1));
+      await sleep(Math.max(retryAfterMs(e), backoff / 2 + Math.random() * backoff / 2));
+    }
+  }
+}
+
+async function main() {
+  const args = parseArgs(process.argv.slice(2));
+  const jobs = loadJobs(args);
+  const rubric = resumeRubricKey();
+  const done = loadDone(args.out, rubric);
+  let todo = jobs.filter((j) => !done.has(j.id));
+  console.log(`${jobs.length} resumes, ${jobs.length - todo.length} already scored, ${todo.length} to go`);
+  if (args.limit > 0) todo = todo.slice(0, args.limit);
+  if (!todo.length) return;
+
+  const OpenAI = (await import("openai")).default;
+  // Retries are ours (with backoff across the whole run), not the SDK's.
+  const client = new OpenAI({
+    apiKey: process.env.OPENAI_API_KEY || (args.baseUrl ? "stub" : undefined),
+    baseURL: args.baseUrl || undefined,
+    maxRetries: 0
+  });
+  const cache = args.noCache ? null : createScoreCache(args.cacheDir ? { dir: args.cacheDir } : {});
+  const pool = createExtractPool(Math.min(args.workers, todo.length));
+  const torn = endsMidLine(args.out);
+  const out = fs.openSync(args.out, "a");
+  // Start on a fresh line so a torn last line from a crash is not glued to our first record.
+  if (torn) fs.writeSync(out, "\n");
+
+  const stats = { ok: 0, error: 0, cached: 0 };
+  const t0 = Date.now();
+  let next = 0;
+
+  async function runOne(job) {
+    const started = Date.now();
+    const rec = { id: job.id, file: job.file, rubric };
+    try {
+      const { sha, text } = await pool.extract(job.file);
+      rec.pdf_sha256 = sha;
+      const prompt = buildResumePrompt({ resumeText: text, resumeName: path.basename(job.file) });
+      const key = resumeScoreKey(prompt);
+      rec.score_key = key;
+      let score = cache ? await cache.getScore(key).catch(() => null) : null;
+      rec.cached = score !== null;
+      rec.attempts = 0;
+      if (score === null) {
+        const r = await withRetry(() => scoreResume(client, prompt), args.retries);
+        score = r.value;
+        rec.attempts = r.attempts;
+        if (cache) await cache.setScore(key, score).catch(() => {});
+      }
+      Object.assign(rec, { status: "ok", model: MODEL, score });
+      stats.ok++;
+      if (rec.cached) stats.cached++;
+    } catch (e) {
+      Object.assign(rec, { status: "error", error: (e && e.message) || String(e), attempts: (e && e.attempts) || 0 });
+      stats.error++;
+    }
+    rec.ms = Date.now() - started;
+    // One write per finished applicant: the output doubles as the resume checkpoint.
+    fs.writeSync(out, JSON.stringify(rec) + "\n");
+    const n = stats.ok + stats.error;
+    if (n % 25 === 0 || n === todo.length) {
+      console.log(`${n}/${todo.length} done (${stats.ok} ok, ${stats.cached} cached, ${stats.error} errors)`);
+    }
+  }
+
+  async function runner() {
+    while (next < todo.length) await runOne(todo[next++]);
+  }
+
+  try {
+    await Promise.all(Array.from({ length: Math.min(args.concurrency, todo.length) }, runner));
+  } finally {
+    fs.closeSync(out);
+    await pool.close();
+  }
+  const dt = (Date.now() - t0) / 1000;
+  console.log(`Scored ${stats.ok}/${todo.length} in ${dt.toFixed(1)}s (${stats.cached} from cache, ${stats.error} errors) -> ${args.out}`);
+  if (stats.error) process.exitCode = 1;
+}
+
+main().catch((e) => {
+  console.error(e && e.stack ? e.stack : e);
+  process.exit(1);
+});
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""Benchmarks for the conversion and training hot loops on synthetic data.
+
+Scales name the pair count; applicants are a tenth of that (at least 1,000), each with
+21 features and essay-sized meta:
+
+  1k    1,000 applicants       1,000 pairs
+  100k  10,000 applicants    100,000 pairs
+  10m   1,000,000 applicants  10,000,000 pairs   (several GB on disk; python train is slow)
+
+Data is generated once per scale into --workdir (a submissions CSV in the sheet's column
+layout and a pairs.csv labeled by a hidden linear model) and reused on later runs.
+Each phase is timed separately, best of --repeat:
+
+  parse_features   make_applicants_jsonl.parse_features over every features_json cell
+  convert          submissions CSV -> applicants.jsonl + --features-bin sidecar (serial)
+  load_jsonl       train_ranker.load_applicants_jsonl
+  load_bin         feature_store.FeatureStore (mmap)
+  load_pairs       train_ranker.prepare_pairs over the streamed pairs.csv
+  train_python     train() for --epochs
+  train_numpy      train_numpy() for --epochs (needs numpy)
+  train_lbfgs      train_lbfgs() for --lbfgs-iters iterations (needs numpy)
+
+  python tools/bench.py --scale 100k --out bench.json
+  python tools/bench.py --scale 100k --baseline bench.json   # exit 1 on a >20% slowdown
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from array import array
+from pathlib import Path
+
+import make_applicants_jsonl as mk
+import train_ranker as tr
+from feature_store import FeatureBinWriter, FeatureStore
+from numpy_support import has_numpy
+
+SCALES = {
+    "1k": (1_000, 1_000),
+    "100k": (10_000, 100_000),
+    "10m": (1_000_000, 10_000_000),
+}
+PHASES = ["parse_features", "convert", "load_jsonl", "load_bin", "load_pairs",
+          "train_python", "train_numpy", "train_lbfgs"]
+DIM = 21
+
+_WORDS = ("the", "student", "math", "proof", "community", "tutoring", "because", "problem",
+          "learned", "volunteer", "research", "calculus", "team", "project", "I", "we",
+          "taught", "analysis", "organized", "club", "data", "model", "school", "and")
+
+
+def _essay(rng, n_words):
+    words = rng.choices(_WORDS, k=n_words)
+    lines = [" ".join(words[k:k + 60]) for k in range(0, n_words, 60)]
+    return ".\n".join(lines) + "."
+
+
+def generate(workdir: Path, n_apps, n_pairs, seed=0):
+    """Write submissions.csv and pairs.csv into workdir (skipped if both already exist)."""
+    csv_path = workdir / "submissions.csv"
+    pairs_path = workdir / "pairs.csv"
+    if csv_path.exists() and pairs_path.exists():
+        return csv_path, pairs_path
+    workdir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    true_w = [rng.gauss(0, 0.5) for _ in range(DIM)]
+    X = array("d")
+    header = ["timestamp", "fullName", "uni", "email", "schoolYear", "raceEth", "gpa", "calc12", "courses",
+              "score_0_10", "raw_score", "feature_version", "resume_chars", "features_json",
+              "essayMath", "essayCommunity"]
+    tmp = csv_path.with_suffix(".tmp")
+    with tmp.open("w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(header)
+        for a in range(n_apps):
+            x = [round(rng.uniform(0, 1), 6) for _ in range(DIM)]
+            X.extend(x)
+            w.writerow([f"2025-01-{1 + a % 28:02d} 12:{a % 60:02d}:00", f"Applicant {a}", f"u{a}",
+                        f"u{a}@example.edu", "Junior", "", f"{rng.uniform(2.5, 4.0):.2f}", "A",
+                        "Linear Algebra; Real Analysis", "", "", "2", str(rng.randint(500, 4000)),
+                        json.dumps(x), _essay(rng, rng.randint(150, 300)), _essay(rng, rng.randint(150, 300))])
+    tmp.replace(csv_path)
+
+    # IDs as make_applicants_jsonl --id-mode uni_timestamp assigns them.
+    ids = [f"u{a}_2025-01-{1 + a % 28:02d} 12:{a % 60:02d}:00" for a in range(n_apps)]
+    tmp = pairs_path.with_suffix(".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        f.write("i,j,y\n")
+        for _ in range(n_pairs):
+            i, j = rng.sample(range(n_apps), 2)
+            s = 4.0 * sum(wk * (X[i * DIM + k] - X[j * DIM + k]) for k, wk in enumerate(true_w))
+            y = 1 if rng.random() < 1.0 / (1.0 + math.exp(-s)) else 0
+            f.write(f"{ids[i]},{ids[j]},{y}\n")
+    tmp.replace(pairs_path)
+    return csv_path, pairs_path
+
+
+def timed(fn, repeat):
+    """Best wall time of repeat calls, and the last call's return value."""
+    best = math.inf
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(args, csv_path: Path, pairs_path: Path, n_apps, n_pairs):
+    workdir = Path(args.workdir)
+    jsonl_path = workdir / "applicants.jsonl"
+    bin_path = workdir / "applicants.bin"
+    phases = [p for p in (args.phases.split(",") if args.phases else PHASES) if p]
+    unknown = set(phases) - set(PHASES)
+    if unknown:
+        raise SystemExit(f"Unknown --phases: {', '.join(sorted(unknown))}")
+    results = {}
+
+    def record(phase, fn, items):
+        dt, out = timed(fn, args.repeat)
+        results[phase] = {"seconds": round(dt, 6), "items": items, "per_sec": round(items / dt, 1) if dt > 0 else None}
+        print(f"{phase:15s} {dt:10.3f}s  {items:>11,d} items  {items / dt if dt > 0 else 0:>14,.0f}/s")
+        return out
+
+    if "parse_features" in phases:
+        with csv_path.open("r", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            col = next(reader).index("features_json")
+            cells = [row[col] for row in reader if row]
+        record("parse_features", lambda: [mk.parse_features(c) for c in cells], len(cells))
+        del cells
+
+    need_convert = not (jsonl_path.exists() and bin_path.exists())
+    if "convert" in phases or need_convert:
+        def convert():
+            sidecar = FeatureBinWriter(bin_path, 2, DIM)
+            with jsonl_path.open("w", encoding="utf-8") as out:
+                mk.convert_serial(csv_path, out, "uni_timestamp", 1000, {"features_bin": sidecar})
+            sidecar.close()
+        if "convert" in phases:
+            record("convert", convert, n_apps)
+        else:
+            convert()
+
+    if "load_jsonl" in phases:
+        record("load_jsonl", lambda: tr.load_applicants_jsonl(jsonl_path), n_apps)
+    if "load_bin" in phases:
+        record("load_bin", lambda: len(FeatureStore(bin_path)), n_apps)
+
+    train_phases = [p for p in ("train_python", "train_numpy", "train_lbfgs") if p in phases]
+    if "load_pairs" in phases or train_phases:
+        id2x = FeatureStore(bin_path)
+        load = lambda: tr.prepare_pairs(id2x, tr.iter_pairs(pairs_path), DIM)
+        if "load_pairs" in phases:
+            D, Y, _ = record("load_pairs", load, n_pairs)
+        else:
+            with contextlib.redirect_stdout(io.StringIO()):
+                D, Y, _ = load()
+
+        if "train_python" in phases:
+            record("train_python", lambda: tr.train(D, Y, DIM, 0.02, args.epochs, 0.001), len(Y) * args.epochs)
+        numpy_phases = [p for p in ("train_numpy", "train_lbfgs") if p in phases]
+        if numpy_phases and not has_numpy():
+            print(f"skipping {', '.join(numpy_phases)} (numpy not installed)")
+        elif numpy_phases:
+            if "train_numpy" in phases:
+                record("train_numpy", lambda: tr.train_numpy(D, Y, DIM, 0.02, args.epochs, 0.001), len(Y) * args.epochs)
+            if "train_lbfgs" in phases:
+                record("train_lbfgs", lambda: tr.train_lbfgs(D, Y, DIM, 0.001, args.lbfgs_iters, tol=0.0, rtol=0.0),
+                       len(Y) * args.lbfgs_iters)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Phases more than threshold slower than baseline: [(phase, old seconds, new seconds)]."""
+    slower = []
+    for phase, r in results.items():
+        old = (baseline.get("results") or {}).get(phase)
+        if old and old.get("items") == r["items"] and r["seconds"] > old["seconds"] * (1 + threshold):
+            slower.append((phase, old["seconds"], r["seconds"]))
+    return slower
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scale", choices=sorted(SCALES), default="1k")
+    ap.add_argument("--workdir", default="", help="Where generated data is cached (default: .bench/<scale>)")
+    ap.add_argument("--phases", default="", help=f"Comma-separated subset of: {','.join(PHASES)}")
+    ap.add_argument("--repeat", type=int, default=3, help="Report the best of this many runs per phase")
+    ap.add_argument("--epochs", type=int, default=1, help="Epochs for the SGD train phases")
+    ap.add_argument("--lbfgs-iters", type=int, default=10)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default="", help="Write results JSON here")
+    ap.add_argument("--baseline", default="", help="Earlier --out file; exit 1 if a phase got slower by more than --threshold")
+    ap.add_argument("--threshold", type=float, default=0.2)
+    args = ap.parse_args()
+
+    n_apps, n_pairs = SCALES[args.scale]
+    args.workdir = args.workdir or str(Path(".bench") / args.scale)
+    args.repeat = max(1, args.repeat)
+    t0 = time.perf_counter()
+    csv_path, pairs_path = generate(Path(args.workdir), n_apps, n_pairs, args.seed)
+    print(f"data: {n_apps} applicants, {n_pairs} pairs in {args.workdir} ({time.perf_counter() - t0:.1f}s)")
+
+    results = run(args, csv_path, pairs_path, n_apps, n_pairs)
+    report = {
+        "scale": args.scale,
+        "applicants": n_apps,
+        "pairs": n_pairs,
+        "repeat": args.repeat,
+        "epochs": args.epochs,
+        "git_commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"wrote results -> {args.out}")
+    if args.baseline:
+        slower = compare(results, json.loads(Path(args.baseline).read_text(encoding="utf-8")), args.threshold)
+        for phase, old, new in slower:
+            print(f"REGRESSION {phase}: {old:.3f}s -> {new:.3f}s ({new / old - 1:+.0%})")
+        if slower:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
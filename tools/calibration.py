@@ -0,0 +1,105 @@
+"""Percentile calibration tables: a pool's raw scores, precomputed for binary search.
+
+rank_calibration.json ships next to rank_model.json:
+
+  {
+    "format": "pme-calibration",
+    "version": 1,
+    "feature_version": 2,
+    "includes_bias": false,   # raw scores were w·x (root rank.js) or w·x + b (public/rank.js)
+    "n": 1234,                # pool size
+    "values": [...],          # sorted distinct raw scores
+    "weights": [...],         # optional: pool entries per value (all 1 when absent)
+    "sketch": {...}           # only for tables from quantile_sketch.py: approximate counts
+  }
+
+percentile(raw) = round1(count of pool scores < raw / (n - 1) * 10), which is exactly
+PMERanker.percentileScore(raw, pool): the count is the weight of the values before
+bisect_left(values, raw). Floats are written with repr, so they round-trip exactly
+through JSON in both Python and JS.
+"""
+
+import json
+import math
+from bisect import bisect_left
+from pathlib import Path
+
+FORMAT = "pme-calibration"
+VERSION = 1
+
+
+def js_round1(x):
+    """rank.js round1: Math.round(x * 10) / 10."""
+    y = x * 10
+    r = math.floor(y)
+    return (r + 1 if y - r >= 0.5 else r) / 10
+
+
+def build_table(raw_scores, feature_version, includes_bias=False):
+    """Exact table: every pool score, duplicates folded into weights."""
+    values = []
+    weights = []
+    for v in sorted(raw_scores):
+        if values and values[-1] == v:
+            weights[-1] += 1
+        else:
+            values.append(v)
+            weights.append(1)
+    return weighted_table(values, weights, feature_version, includes_bias)
+
+
+def weighted_table(values, weights, feature_version, includes_bias=False, extra=None):
+    """Table from sorted distinct values and their pool counts (e.g. a quantile sketch's items)."""
+    table = {
+        "format": FORMAT,
+        "version": VERSION,
+        "feature_version": feature_version,
+        "includes_bias": bool(includes_bias),
+        "n": sum(weights),
+        "values": list(values),
+    }
+    if any(c != 1 for c in weights):
+        table["weights"] = list(weights)
+    table.update(extra or {})
+    return table
+
+
+def save_table(path: Path, table):
+    Path(path).write_text(json.dumps(table, separators=(",", ":")), encoding="utf-8")
+
+
+def load_table(path: Path):
+    table = json.loads(Path(path).read_text(encoding="utf-8"))
+    if not isinstance(table, dict) or table.get("format") != FORMAT:
+        raise ValueError(f"{path}: not a calibration table")
+    if table.get("version") != VERSION:
+        raise ValueError(f"{path}: unsupported calibration version {table.get('version')}")
+    values = table.get("values")
+    weights = table.get("weights")
+    if not isinstance(values, list) or any(b <= a for a, b in zip(values, values[1:])):
+        raise ValueError(f"{path}: values must be strictly increasing")
+    if weights is not None and (len(weights) != len(values) or any(c < 0 for c in weights)):
+        raise ValueError(f"{path}: weights must be non-negative, one per value")
+    return table
+
+
+class Calibrator:
+    """percentile(raw) against a table in O(log n)."""
+
+    def __init__(self, table):
+        self.values = [float(v) for v in table["values"]]
+        weights = table.get("weights") or [1] * len(self.values)
+        self.below = [0] * (len(weights) + 1)
+        for k, c in enumerate(weights):
+            self.below[k + 1] = self.below[k] + c
+        self.n = self.below[-1]
+        self.includes_bias = bool(table.get("includes_bias"))
+
+    def count_below(self, raw):
+        return self.below[bisect_left(self.values, raw)]
+
+    def percentile(self, raw):
+        if self.n == 0:
+            return 5.0
+        pct = 0.5 if self.n <= 1 else self.count_below(raw) / (self.n - 1)
+        return js_round1(pct * 10)
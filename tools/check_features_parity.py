@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Check that pme_features.build_features matches PMEFeatures.buildFeatures (public/features.js).
+
+Runs the browser module under node (one process for all cases) on randomized inputs and,
+with --input, on every applicant of an applicants.jsonl / submissions CSV (params as in
+refeaturize.py). Features must agree exactly (both sides round to 6 decimals), and an
+input one side rejects must be rejected by the other. pme_features reads None as JS
+undefined, so None-valued params are left out of what node sees rather than sent as null.
+
+  python tools/check_features_parity.py
+  python tools/check_features_parity.py --cases 5000 --seed 7
+  python tools/check_features_parity.py --input data/applicants.jsonl --resume-dir resumes/
+"""
+
+import argparse
+import json
+import random
+import subprocess
+from pathlib import Path
+
+import pme_features as pf
+from refeaturize import find_resume, iter_applicants, params_from_meta
+
+FEATURES_JS = Path(__file__).resolve().parent.parent / "public" / "features.js"
+
+# Reads one JSON params object per stdin line, writes {"f": [...]} or {"error": "..."} per line.
+NODE_RUNNER = r"""
+const fs = require("fs");
+const vm = require("vm");
+const ctx = { window: {} };
+vm.runInNewContext(fs.readFileSync(process.argv[1], "utf8"), ctx);
+const { buildFeatures } = ctx.window.PMEFeatures;
+const out = [];
+for (const line of fs.readFileSync(0, "utf8").split("\n")) {
+  if (!line) continue;
+  try {
+    out.push(JSON.stringify({ f: buildFeatures(JSON.parse(line)) }));
+  } catch (e) {
+    out.push(JSON.stringify({ error: String((e && e.message) || e) }));
+  }
+}
+process.stdout.write(out.join("\n") + "\n");
+"""
+
+COURSES = [
+    "MATH UN1101", "MATH UN2010", "MATH UN3007", "MATH GU4041", "MATH GU4061", "MATH GR5010",
+    "MATH GR6151", "MATH BC2006", "math un3951", "MATH  GU4042", "MATH GU 4043", "COMS W3134",
+    "MATH UN300", "",
+]
+FILLER = [
+    "i", "the", "and", "a", "of", "to", "we", "my", "this", "because", "therefore", "then",
+    "class", "project", "students", "problem", "2024", "x", "math", "community", "ta",
+]
+SPACES = [" ", " ", " ", "  ", "\n", "\t", " ", " ", "\r\n"]
+PUNCT = ["", "", "", ",", ".", "!", "?", "...", ";", ":"]
+
+
+def random_text(rng, words, max_words):
+    out = []
+    for _ in range(rng.randint(0, max_words)):
+        w = rng.choice(words)
+        if rng.random() < 0.2:
+            w = w.upper() if rng.random() < 0.5 else w.title()
+        out.append(w + rng.choice(PUNCT) + rng.choice(SPACES))
+    return "".join(out)
+
+
+def random_params(rng, words):
+    gpa = rng.choice([
+        round(rng.uniform(0, 4.3), rng.randint(0, 3)), str(round(rng.uniform(2, 4), 2)),
+        " 3.9 ", "", "abc", None, 4, "4.0e0",
+    ])
+    p = {
+        "gpa": gpa,
+        "calcVal": rng.choice(["yes", "no", " yes ", "maybe", ""]),
+        "resumeText": random_text(rng, words, rng.choice([0, 30, 400, 2500])),
+        "essayMath": random_text(rng, words, rng.choice([0, 20, 80])),
+        "essayComm": random_text(rng, words, rng.choice([0, 20, 80])),
+    }
+    if rng.random() < 0.8:
+        p["courses"] = [rng.choice(COURSES) for _ in range(rng.randint(0, 8))]
+    else:
+        p["upperCount"] = rng.choice([0, 3, 7, 25, "4", "x", "", None])
+        p["upperRigor"] = rng.choice(["", "proof", "upper", "grad", " grad "])
+    if rng.random() < 0.3:
+        del p[rng.choice(list(p))]
+    return p
+
+
+def run_node(node, features_js: Path, cases):
+    stdin = "".join(json.dumps({k: v for k, v in p.items() if v is not None}, ensure_ascii=False) + "\n"
+                    for p in cases)
+    try:
+        r = subprocess.run([node, "-e", NODE_RUNNER, str(features_js)], input=stdin,
+                           capture_output=True, text=True, encoding="utf-8", check=False)
+    except OSError as e:
+        raise SystemExit(f"Could not run {node}: {e}")
+    if r.returncode != 0:
+        raise SystemExit(f"node failed ({r.returncode}):\n{r.stderr}")
+    return [json.loads(line) for line in r.stdout.splitlines() if line]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cases", type=int, default=1000, help="Randomized inputs to compare")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--input", default="", help="Also compare every applicant in this applicants.jsonl or CSV")
+    ap.add_argument("--resume-dir", default="", help="Resume text for --input, as in refeaturize.py")
+    ap.add_argument("--features-js", default=str(FEATURES_JS))
+    ap.add_argument("--node", default="node", help="node executable")
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    words = [k for kws in list(pf.KW.values()) + list(pf.SECTION_KW.values()) for k in kws] + FILLER
+    cases = [random_params(rng, words) for _ in range(args.cases)]
+    labels = [f"random #{n}" for n in range(len(cases))]
+    if args.input:
+        resume_dir = Path(args.resume_dir) if args.resume_dir else None
+        for obj in iter_applicants(Path(args.input)):
+            cases.append(params_from_meta(obj.get("meta") or {}, find_resume(resume_dir, obj)))
+            labels.append(str(obj.get("id")))
+
+    results = run_node(args.node, Path(args.features_js), cases)
+    if len(results) != len(cases):
+        raise SystemExit(f"node returned {len(results)} results for {len(cases)} inputs")
+
+    dim = len(pf.FEATURE_NAMES)
+    mismatches = [0] * dim
+    n_err = n_bad = 0
+    examples = []
+    for label, params, js in zip(labels, cases, results):
+        try:
+            py = pf.build_features(params)
+        except ValueError as e:
+            if "error" in js:
+                n_err += 1
+                continue
+            n_bad += 1
+            examples.append(f"{label}: python raised {e!r}, js returned features")
+            continue
+        if "error" in js:
+            n_bad += 1
+            examples.append(f"{label}: js threw {js['error']!r}, python returned features")
+            continue
+        diff = [k for k in range(dim) if py[k] != js["f"][k]]
+        for k in diff:
+            mismatches[k] += 1
+        if diff:
+            n_bad += 1
+            k = diff[0]
+            examples.append(f"{label} {pf.FEATURE_NAMES[k]}: python={py[k]} js={js['f'][k]}")
+
+    print(f"compared {len(cases)} inputs ({n_err} rejected by both, {n_bad} differing)")
+    for k, name in enumerate(pf.FEATURE_NAMES):
+        if mismatches[k]:
+            print(f"  {k:2d} {name:32s} mismatched={mismatches[k]}")
+    for line in examples[:10]:
+        print(f"  e.g. {line}")
+    if n_bad:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Resubmission detection: group applicants.jsonl records that belong to one person.
+
+Two records are the same person when any of these hold:
+  uni     same UNI (case-insensitive)
+  email   same email (case-insensitive; a +tag in the local part is ignored)
+  essay   near-identical essays: estimated Jaccard similarity of word 3-gram shingles
+          >= threshold (MinHash, 64 hashes, LSH with 16 bands of 4 rows). An essay match
+          is not applied when both groups carry different UNIs and different emails.
+          Those are two people with copied text, and they are counted as conflicts.
+
+Records stream in once, in output order. Each holds a few hash-table entries and a
+64-int signature. The latest record of a group is the last one in the CSV (Google Forms
+appends responses in submission order) and becomes the group's canonical id.
+
+The id map (make_applicants_jsonl.py --id-map) is a CSV with columns id, canonical,
+match. It has one row for every record in a group of two or more. train_ranker.py and
+score_pool.py --id-map use it to count each person once.
+"""
+
+import csv
+import hashlib
+import re
+import zlib
+from pathlib import Path
+
+from numpy_support import has_numpy
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+MIN_SHINGLES = 8  # essays shorter than this are not compared
+MAX_BUCKET = 64   # boilerplate essays ("N/A", templates) stop being compared past this many
+DEFAULT_THRESHOLD = 0.8
+
+_MASK = (1 << 64) - 1
+_K1 = 0x9E3779B97F4A7C15
+_WORD = re.compile(r"\w+")
+
+
+def _perm_params():
+    # Fixed multiply-shift hash family (odd multipliers), so signatures are reproducible.
+    out = []
+    for k in range(NUM_PERM):
+        d = hashlib.blake2b(f"pme-minhash-{k}".encode(), digest_size=16).digest()
+        out.append((int.from_bytes(d[:8], "little") | 1, int.from_bytes(d[8:], "little")))
+    return out
+
+
+_PERMS = _perm_params()
+
+
+def email_key(email):
+    e = (email or "").strip().lower()
+    if "@" not in e:
+        return ""
+    local, domain = e.rsplit("@", 1)
+    return local.split("+", 1)[0] + "@" + domain
+
+
+def shingle_hashes(text):
+    """Distinct 64-bit hashes of the text's word 3-grams (crc32 per word, combined by polynomial)."""
+    words = [zlib.crc32(w.encode("utf-8")) for w in _WORD.findall((text or "").lower())]
+    return list({((a * _K1 + b) * _K1 + c) & _MASK for a, b, c in zip(words, words[1:], words[2:])})
+
+
+def minhash(text):
+    """64 MinHash values (ints) for the text's word shingles, or None if it is too short."""
+    hs = shingle_hashes(text)
+    if len(hs) < MIN_SHINGLES:
+        return None
+    if has_numpy():
+        import numpy as np
+
+        H = np.asarray(hs, dtype=np.uint64)
+        A = np.asarray([a for a, _ in _PERMS], dtype=np.uint64)[:, None]
+        B = np.asarray([b for _, b in _PERMS], dtype=np.uint64)[:, None]
+        with np.errstate(over="ignore"):
+            return ((A * H + B) >> np.uint64(32)).min(axis=1).tolist()
+    return [min(((a * h + b) & _MASK) >> 32 for h in hs) for a, b in _PERMS]
+
+
+def record_keys(meta):
+    """(uni key, email key, essay signature) for one applicant's meta; computed where rows are packed."""
+    meta = meta or {}
+    essays = " ".join(str(meta.get(k) or "") for k in ("essayMath", "essayCommunity"))
+    return (str(meta.get("uni") or "").strip().lower(), email_key(meta.get("email")), minhash(essays))
+
+
+class DedupIndex:
+    def __init__(self, threshold=DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.ids = []
+        self.sigs = []
+        self.parent = []
+        self.how = []        # how each record first joined its group
+        self.unis = []       # per root: set of UNIs / emails in the group
+        self.emails = []
+        self.by_uni = {}
+        self.by_email = {}
+        self.buckets = {}
+        self.conflicts = []  # (id, id) essay matches between different people
+
+    def _find(self, r):
+        while self.parent[r] != r:
+            self.parent[r] = self.parent[self.parent[r]]
+            r = self.parent[r]
+        return r
+
+    def _union(self, r, other, how, check=False):
+        a, b = self._find(r), self._find(other)
+        if a == b:
+            return True
+        if check and (self.unis[a] and self.unis[b] and not self.unis[a] & self.unis[b]
+                      and self.emails[a] and self.emails[b] and not self.emails[a] & self.emails[b]):
+            return False
+        for t in (r, other):
+            if self.how[t] is None:
+                self.how[t] = how
+        self.parent[a] = b
+        self.unis[b] |= self.unis[a]
+        self.emails[b] |= self.emails[a]
+        self.unis[a] = self.emails[a] = None
+        return True
+
+    def add(self, id_, keys):
+        uni, email, sig = keys
+        r = len(self.ids)
+        self.ids.append(id_)
+        self.sigs.append(sig)
+        self.parent.append(r)
+        self.how.append(None)
+        self.unis.append({uni} if uni else set())
+        self.emails.append({email} if email else set())
+        if uni:
+            self._union(r, self.by_uni.setdefault(uni, r), "uni")
+        if email:
+            self._union(r, self.by_email.setdefault(email, r), "email")
+        if sig is None:
+            return
+        seen = set()
+        for band in range(BANDS):
+            bucket = self.buckets.setdefault((band, tuple(sig[band * ROWS:(band + 1) * ROWS])), [])
+            for other in bucket:
+                if other in seen:
+                    continue
+                seen.add(other)
+                osig = self.sigs[other]
+                same = sum(1 for x, y in zip(sig, osig) if x == y)
+                if same >= self.threshold * NUM_PERM and not self._union(r, other, "essay", check=True):
+                    self.conflicts.append((self.ids[other], id_))
+            if len(bucket) < MAX_BUCKET:
+                bucket.append(r)
+
+    def add_batch(self, ids, keys):
+        for id_, k in zip(ids, keys):
+            self.add(id_, k)
+
+    def groups(self):
+        """{root: [rows]} for groups with two or more records."""
+        out = {}
+        for r in range(len(self.ids)):
+            out.setdefault(self._find(r), []).append(r)
+        return {root: rows for root, rows in out.items() if len(rows) > 1}
+
+    def id_map(self):
+        """[(id, canonical id, match)] for every record in a duplicate group; the latest record is canonical."""
+        rows = []
+        for members in self.groups().values():
+            canon = self.ids[max(members)]
+            for r in members:
+                rows.append((r, self.ids[r], canon, self.how[r]))
+        rows.sort()
+        return [row[1:] for row in rows]
+
+
+def write_id_map(path: Path, rows):
+    with Path(path).open("w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["id", "canonical", "match"])
+        w.writerows(rows)
+
+
+def load_id_map(path: Path):
+    """{id: canonical id} from an --id-map CSV."""
+    with Path(path).open("r", encoding="utf-8", newline="") as f:
+        return {r["id"]: r["canonical"] for r in csv.DictReader(f) if r.get("id") and r.get("canonical")}
+
+
+def remap_pairs(pairs, id_map):
+    """Rewrite (i, j, y) pairs onto canonical ids, dropping pairs that compare a person with themself."""
+    for i, j, y in pairs:
+        i = id_map.get(i, i)
+        j = id_map.get(j, j)
+        if i != j:
+            yield i, j, y
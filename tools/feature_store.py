@@ -0,0 +1,108 @@
+"""Binary columnar sidecar for applicants.jsonl: just the feature matrix and IDs.
+
+Layout (little-endian):
+  0   8s  magic b"PMEFEAT1"
+  8   u32 format version (1)
+  12  u32 feature_version
+  16  u32 n (applicants)
+  20  u32 dim
+  24  u64 ids_bytes
+  32  f64[n * dim] features, row-major
+  ..  ids, UTF-8, "\\n"-separated (ids_bytes long)
+
+Rows keep applicants.jsonl order. Loading memory-maps the file, so features are never
+parsed; only the ID block is decoded to build the id -> row index.
+"""
+
+import mmap
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+from pathlib import Path
+
+MAGIC = b"PMEFEAT1"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sIIIIQ")
+
+
+def is_feature_store(path: Path) -> bool:
+    with path.open("rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class FeatureBinWriter:
+    """Stream rows into a sidecar; the header is patched with the final counts on close()."""
+
+    def __init__(self, path: Path, feature_version: int, dim: int):
+        self.path = Path(path)
+        self.feature_version = feature_version
+        self.dim = dim
+        self.n = 0
+        self.ids = []
+        self.f = self.path.open("wb")
+        self.f.write(b"\0" * _HEADER.size)
+
+    def add_batch(self, ids, feats: array):
+        """Append len(ids) rows; feats is a flat array('d') of len(ids) * dim values."""
+        if len(feats) != len(ids) * self.dim:
+            raise ValueError(f"expected {len(ids) * self.dim} feature values, got {len(feats)}")
+        for id_ in ids:
+            if "\n" in id_:
+                raise ValueError(f"applicant id contains a newline: {id_!r}")
+        if sys.byteorder != "little":
+            feats = array("d", feats)
+            feats.byteswap()
+        feats.tofile(self.f)
+        self.ids.extend(ids)
+        self.n += len(ids)
+
+    def close(self):
+        id_bytes = "\n".join(self.ids).encode("utf-8")
+        self.f.write(id_bytes)
+        self.f.seek(0)
+        self.f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, self.feature_version, self.n, self.dim, len(id_bytes)))
+        self.f.close()
+
+
+class FeatureStore(Mapping):
+    """Read-only id -> feature-row mapping over a memory-mapped sidecar.
+
+    Rows are memoryview slices (len() and iteration work like the lists from
+    load_applicants_jsonl); `matrix` is the whole flat float64 buffer.
+    """
+
+    def __init__(self, path: Path):
+        with Path(path).open("rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, fmt, self.feature_version, n, self.dim, ids_bytes = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a feature store (bad magic)")
+        if fmt != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported feature store format {fmt}")
+
+        start = _HEADER.size
+        end = start + n * self.dim * 8
+        if len(self._mm) != end + ids_bytes:
+            raise ValueError(f"{path}: truncated or corrupt feature store")
+
+        if sys.byteorder == "little":
+            self.matrix = memoryview(self._mm)[start:end].cast("d")
+        else:
+            self.matrix = array("d", self._mm[start:end])
+            self.matrix.byteswap()
+        self.ids = self._mm[end:end + ids_bytes].decode("utf-8").split("\n") if n else []
+        self._row = {id_: r for r, id_ in enumerate(self.ids)}
+
+    def row_of(self, id_):
+        return self._row.get(id_)
+
+    def __getitem__(self, id_):
+        r = self._row[id_]
+        return self.matrix[r * self.dim:(r + 1) * self.dim]
+
+    def __iter__(self):
+        return iter(self._row)
+
+    def __len__(self):
+        return len(self._row)
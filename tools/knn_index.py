@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""Exact k-nearest-neighbor index over applicant feature vectors (KD-tree), saved to disk.
+
+Distances are Euclidean over z-scored features (each dimension divided by its pool std;
+zero-variance dimensions are left unscaled). Without this, the
+largest-range features (word counts, essay signals) would dominate. Use --raw for plain
+feature-space distances.
+
+The tree splits at the median of the widest dimension until a node holds at most
+--leaf-size rows. Points are stored in leaf order so every leaf is one contiguous block.
+A query descends to the nearest leaf first, then visits the other side of a split only
+when the splitting plane is closer than the current k-th neighbor. The answer is always
+exact. With numpy, each leaf is scanned in one vectorized step. A k=10 query over 5k
+applicants then takes ~0.2 ms when the pool is clustered, and ~1 ms in the worst case of
+uniform noise, where pruning barely helps in 21 dimensions. The pure-Python path is about
+5x slower.
+
+Layout (little-endian):
+  0   8s  magic b"PMEKNN01"
+  8   u32 format version (1)
+  12  u32 feature_version
+  16  u32 n (applicants)
+  20  u32 dim
+  24  u32 n_nodes
+  28  u32 flags (bit 0: features were z-scored)
+  32  u64 ids_bytes
+  40  f64[dim] scale (pool std per feature, or 1s)
+  ..  f64[n * dim] features, in tree order
+  ..  n_nodes records of (split_dim: i32, split: f64, lo: u32, hi: u32, left: i32, right: i32);
+      split_dim -1 marks a leaf holding points lo..hi-1
+  ..  ids in tree order, UTF-8, "\\n"-separated (ids_bytes long)
+
+  python tools/knn_index.py build --applicants data/applicants.jsonl --out applicants.knn
+  python tools/knn_index.py query --index applicants.knn --id jd5_2026-01-18T07:23:03.130Z -k 10 \\
+      --model public/model/rank_model.json
+"""
+
+import argparse
+import heapq
+import json
+import math
+import struct
+import sys
+import time
+from array import array
+from pathlib import Path
+
+import train_ranker as tr
+from feature_store import FeatureStore, is_feature_store
+from numpy_support import has_numpy
+from score_pool import raw_scores
+
+MAGIC = b"PMEKNN01"
+FORMAT_VERSION = 1
+FLAG_STANDARDIZED = 1
+DEFAULT_LEAF_SIZE = 64
+_HEADER = struct.Struct("<8sIIIIIIQ")
+_NODE = struct.Struct("<idIIii")
+
+
+def _meta_feature_version(path: Path):
+    """meta.feature_version of the first applicants.jsonl line as an int, or None if absent or
+    not an integer (--meta-out splits carry no meta at all)."""
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                meta = json.loads(line).get("meta")
+                v = float(meta.get("feature_version"))
+            except (ValueError, TypeError, AttributeError):
+                return None
+            return int(v) if v.is_integer() else None
+    return None
+
+
+def _rows(path: Path):
+    """(ids, rows, feature_version) from applicants.jsonl or a feature_store sidecar.
+
+    feature_version is the store header's, or None for applicants.jsonl.
+    """
+    if is_feature_store(path):
+        store = FeatureStore(path)
+        d = store.dim
+        return list(store.ids), [list(store.matrix[r * d:(r + 1) * d]) for r in range(len(store.ids))], \
+            store.feature_version
+    ids, rows = [], []
+    for id_, x in tr.iter_applicants_jsonl(path):
+        try:
+            rows.append([float(v) for v in x])
+        except (TypeError, ValueError):
+            continue
+        ids.append(id_)
+    return ids, rows, None
+
+
+class KNNIndex:
+    def __init__(self, ids, points, dim, nodes, scale, feature_version=0, standardized=True):
+        self.ids = ids
+        self.points = points  # flat raw features, tree order
+        self.dim = dim
+        self.nodes = nodes  # [(split_dim, split, lo, hi, left, right)]
+        self.scale = scale
+        self.inv = [1.0 / v for v in scale]
+        self._scaled = None
+        if has_numpy() and ids:
+            import numpy as np
+
+            self._scaled = np.frombuffer(points, dtype=np.float64).reshape(len(ids), dim) * np.asarray(self.inv)
+        self.feature_version = feature_version
+        self.standardized = standardized
+        self._row = {id_: r for r, id_ in enumerate(ids)}
+
+    @classmethod
+    def build(cls, ids, rows, feature_version=0, standardize=True, leaf_size=DEFAULT_LEAF_SIZE):
+        """Index rows (equal-length feature lists); rows of another length are skipped."""
+        dim = len(rows[0]) if rows else 0
+        keep = [r for r in range(len(rows)) if len(rows[r]) == dim]
+        n = len(keep)
+        scale = [1.0] * dim
+        if standardize and n:
+            for k in range(dim):
+                col = [rows[r][k] for r in keep]
+                m = math.fsum(col) / n
+                sd = math.sqrt(math.fsum((v - m) ** 2 for v in col) / n)
+                scale[k] = sd if sd > 0 else 1.0
+        pts = [rows[r] for r in keep]
+        order = list(range(n))
+        nodes = []
+
+        def split(lo, hi):
+            node = len(nodes)
+            nodes.append(None)
+            if hi - lo <= leaf_size:
+                nodes[node] = (-1, 0.0, lo, hi, -1, -1)
+                return node
+            block = order[lo:hi]
+            spread = [(max(pts[p][k] for p in block) - min(pts[p][k] for p in block)) / scale[k] for k in range(dim)]
+            d = max(range(dim), key=spread.__getitem__)
+            if spread[d] == 0:
+                nodes[node] = (-1, 0.0, lo, hi, -1, -1)
+                return node
+            block.sort(key=lambda p: pts[p][d])
+            order[lo:hi] = block
+            mid = (lo + hi) // 2
+            s = pts[order[mid]][d]
+            left = split(lo, mid)
+            right = split(mid, hi)
+            nodes[node] = (d, s, lo, hi, left, right)
+            return node
+
+        if n:
+            sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+            split(0, n)
+        points = array("d")
+        for p in order:
+            points.extend(pts[p])
+        return cls([ids[keep[p]] for p in order], points, dim, nodes, scale, feature_version, standardize)
+
+    def query(self, x, k=10, exclude=None):
+        """[(distance, id)] for the k nearest rows to feature vector x, nearest first; exclude is a row to skip."""
+        if len(x) != self.dim:
+            raise ValueError(f"expected {self.dim} features, got {len(x)}")
+        if not self.nodes or k <= 0:
+            return []
+        q = [float(v) for v in x]
+        pts, dim, nodes, ids, inv, scaled = self.points, self.dim, self.nodes, self.ids, self.inv, self._scaled
+        if scaled is not None:
+            import numpy as np
+
+            qs = np.asarray(q) * np.asarray(inv)
+        heap = []  # max-heap of (-d2, row)
+        worst = math.inf
+        stack = [(0, 0.0)]
+        while stack:
+            node, plane_d2 = stack.pop()
+            if plane_d2 >= worst:
+                continue
+            d, s, lo, hi, left, right = nodes[node]
+            if d >= 0:
+                diff = (q[d] - s) * inv[d]
+                near, far = (left, right) if diff < 0 else (right, left)
+                stack.append((far, diff * diff))
+                stack.append((near, 0.0))
+                continue
+            if scaled is not None:
+                # Same leaf scan, one vectorized distance computation per leaf.
+                d2s = ((scaled[lo:hi] - qs) ** 2).sum(axis=1)
+                if exclude is not None and lo <= exclude < hi:
+                    d2s[exclude - lo] = math.inf
+                for t in np.flatnonzero(d2s < worst).tolist():
+                    d2 = float(d2s[t])
+                    if d2 >= worst:
+                        continue
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-d2, lo + t))
+                        if len(heap) == k:
+                            worst = -heap[0][0]
+                    else:
+                        heapq.heapreplace(heap, (-d2, lo + t))
+                        worst = -heap[0][0]
+                continue
+            for r in range(lo, hi):
+                if r == exclude:
+                    continue
+                base = r * dim
+                d2 = 0.0
+                for j in range(dim):
+                    t = (q[j] - pts[base + j]) * inv[j]
+                    d2 += t * t
+                    if d2 >= worst:
+                        break
+                else:
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-d2, r))
+                        if len(heap) == k:
+                            worst = -heap[0][0]
+                    else:
+                        heapq.heapreplace(heap, (-d2, r))
+                        worst = -heap[0][0]
+        return [(math.sqrt(-nd2), ids[r]) for nd2, r in sorted(heap, reverse=True)]
+
+    def neighbors_of(self, id_, k=10):
+        """The k nearest other applicants to an indexed applicant."""
+        r = self._row[id_]
+        return self.query(self.features_of(id_), k, exclude=r)
+
+    def features_of(self, id_):
+        r = self._row[id_]
+        return self.points[r * self.dim:(r + 1) * self.dim]
+
+    def save(self, path: Path):
+        id_bytes = "\n".join(self.ids).encode("utf-8")
+        if any("\n" in id_ for id_ in self.ids):
+            raise ValueError("applicant id contains a newline")
+        with Path(path).open("wb") as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, self.feature_version, len(self.ids), self.dim,
+                                 len(self.nodes), FLAG_STANDARDIZED if self.standardized else 0, len(id_bytes)))
+            head = array("d", self.scale)
+            pts = array("d", self.points)
+            if sys.byteorder != "little":
+                head.byteswap()
+                pts.byteswap()
+            head.tofile(f)
+            pts.tofile(f)
+            f.write(b"".join(_NODE.pack(*nd) for nd in self.nodes))
+            f.write(id_bytes)
+
+    @classmethod
+    def load(cls, path: Path):
+        data = Path(path).read_bytes()
+        if len(data) < _HEADER.size:
+            raise ValueError(f"{path}: not a kNN index")
+        magic, fmt, fv, n, dim, n_nodes, flags, ids_bytes = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a kNN index (bad magic)")
+        if fmt != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported kNN index format {fmt}")
+        off = _HEADER.size
+        end = off + (dim + n * dim) * 8 + n_nodes * _NODE.size + ids_bytes
+        if len(data) != end:
+            raise ValueError(f"{path}: truncated or corrupt kNN index")
+        floats = array("d", data[off:off + (dim + n * dim) * 8])
+        if sys.byteorder != "little":
+            floats.byteswap()
+        off += len(floats) * 8
+        nodes = [_NODE.unpack_from(data, off + t * _NODE.size) for t in range(n_nodes)]
+        off += n_nodes * _NODE.size
+        ids = data[off:off + ids_bytes].decode("utf-8").split("\n") if n else []
+        return cls(ids, floats[dim:], dim, nodes, list(floats[:dim]), fv, bool(flags & FLAG_STANDARDIZED))
+
+
+def cmd_build(args):
+    t0 = time.perf_counter()
+    path = Path(args.applicants)
+    ids, rows, fv = _rows(path)
+    if not ids:
+        raise SystemExit(f"No applicants in {args.applicants}")
+    if fv is None:
+        fv = _meta_feature_version(path)
+    if fv is None:
+        fv = args.feature_version
+    if fv != args.feature_version:
+        raise SystemExit(f"{args.applicants} has feature_version {fv}, expected {args.feature_version}")
+    t1 = time.perf_counter()
+    index = KNNIndex.build(ids, rows, fv, standardize=not args.raw, leaf_size=max(1, args.leaf_size))
+    t2 = time.perf_counter()
+    index.save(Path(args.out))
+    skipped = len(ids) - len(index.ids)
+    print(f"Indexed {len(index.ids)} applicants x {index.dim} features into {len(index.nodes)} nodes "
+          f"({skipped} skipped: wrong feature count; load {t1 - t0:.2f}s, build {t2 - t1:.2f}s) -> {args.out}")
+
+
+def cmd_query(args):
+    index = KNNIndex.load(Path(args.index))
+    w = bias = None
+    if args.model:
+        model = tr.load_model(Path(args.model))
+        w = [float(v) for v in model["weights"]]
+        if len(w) != index.dim:
+            raise SystemExit(f"{args.model} has {len(w)} weights; the index has {index.dim} features")
+        if index.feature_version and model.get("feature_version") not in (None, index.feature_version):
+            raise SystemExit(f"{args.model} feature_version {model.get('feature_version')} "
+                             f"!= index {index.feature_version}")
+        bias = float(model.get("bias") or 0.0) if args.use_bias else 0.0
+
+    def score(id_):
+        if w is None:
+            return None
+        return raw_scores(array("d", index.features_of(id_)), w, bias)[0]
+
+    for id_ in args.id:
+        t0 = time.perf_counter()
+        try:
+            hits = index.neighbors_of(id_, args.k)
+        except KeyError:
+            raise SystemExit(f"{id_} is not in {args.index}")
+        dt = time.perf_counter() - t0
+        head = f"{id_}" + (f" (raw {score(id_):.4f})" if w is not None else "")
+        print(f"{head}: {len(hits)} neighbors in {dt * 1000:.2f} ms")
+        for rank, (dist, nid) in enumerate(hits, 1):
+            line = f"  {rank:>3}  {nid}  dist={dist:.4f}"
+            if w is not None:
+                line += f"  raw={score(nid):.4f}"
+            print(line)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    b = sub.add_parser("build", help="Build an index from applicants.jsonl or a --features-bin sidecar")
+    b.add_argument("--applicants", required=True)
+    b.add_argument("--out", required=True, help="Index file to write")
+    b.add_argument("--raw", action="store_true", help="Distances on raw features instead of z-scored ones")
+    b.add_argument("--leaf-size", type=int, default=DEFAULT_LEAF_SIZE)
+    b.add_argument("--feature-version", type=int, default=2,
+                   help="Feature version recorded in the index (a feature store or meta.feature_version must agree)")
+    b.set_defaults(func=cmd_build)
+
+    q = sub.add_parser("query", help="Nearest neighbors of indexed applicants")
+    q.add_argument("--index", required=True)
+    q.add_argument("--id", nargs="+", required=True, help="Applicant ID(s) to look up")
+    q.add_argument("-k", type=int, default=10, help="Neighbors per applicant")
+    q.add_argument("--model", default="", help="rank_model.json: also print raw scores")
+    q.add_argument("--use-bias", action="store_true", help="Add the model bias like public/rank.js")
+    q.set_defaults(func=cmd_query)
+
+    args = ap.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,26 @@
 import argparse
 import ast
 import csv
+import io
 import json
+import os
+import re
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from dedup import DEFAULT_THRESHOLD, DedupIndex, record_keys, write_id_map
+from feature_store import FeatureBinWriter
+from profiling import PhaseProfiler, add_profile_args
+
+# One shared encoder; json.dumps(..., ensure_ascii=False) builds a new one per call.
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+# Anything float() would read differently from json.loads/literal_eval: letters other than
+# exponents (inf/nan), underscores, brackets/quotes, or integers with a leading zero.
+_NOT_PLAIN_NUMBERS = re.compile(r"[^0-9eE.,+\- ]|(?<![0-9.eE])0[0-9]")
+
 
 def first(row, *keys, default=""):
     """Return the first matching column value from row for any of the given keys."""
@@ -14,10 +31,35 @@ def first(row, *keys, default=""):
     return default
 
 
+def column_getter(fieldnames, *keys):
+    """Resolve first(row, *keys) against the header once; the result reads a csv.reader list row.
+
+    Matches csv.DictReader semantics: duplicate headers resolve to the last column, and a
+    column past the end of a short row counts as missing.
+    """
+    col = {name: k for k, name in enumerate(fieldnames)}
+    cols = tuple(col[k] for k in keys if k in col)
+
+    def get(row, default=""):
+        for c in cols:
+            if c < len(row):
+                return row[c]
+        return default
+
+    return get
+
+
 def parse_features(s: str):
     s = (s or "").strip()
     if not s:
         return None
+    # Fast path for the common "[n,n,...]" export: split + float, no exception-driven parsing.
+    if s[0] == "[" and s[-1] == "]" and not _NOT_PLAIN_NUMBERS.search(s, 1, len(s) - 1):
+        try:
+            return [float(v) for v in s[1:-1].split(",")]
+        except ValueError:
+            pass
+
     # Most likely JSON like: [1,2,3] but sometimes Google Sheets exports odd quoting.
     try:
         v = json.loads(s)
@@ -36,12 +78,246 @@ def parse_features(s: str):
     return None
 
 
+def make_row_converter(fieldnames, id_mode):
+    """Return convert(row, idx) -> applicants.jsonl object (or None if features are missing/bad).
+
+    Column lookups are resolved once per header so the per-row work is list indexing only.
+    """
+    # Your sheet uses these names (from your screenshot):
+    # timestamp, fullName, uni, email, schoolYear, raceEth, gpa, calc12, courses,
+    # score_0_10, raw_score, feature_version, resume_chars, features_json, essayMath, essayCommunity, ...
+    g_features = column_getter(fieldnames, "features_json", "features", "featuresJson")
+    g_timestamp = column_getter(fieldnames, "timestamp")
+    g_uni = column_getter(fieldnames, "uni")
+    g_name = column_getter(fieldnames, "fullName", "fullname", "name")
+    stripped = [
+        ("email", column_getter(fieldnames, "email")),
+        ("schoolYear", column_getter(fieldnames, "schoolYear", "schoolYearText")),
+        ("raceEth", column_getter(fieldnames, "raceEth")),
+        ("gpa", column_getter(fieldnames, "gpa")),
+        ("calc12", column_getter(fieldnames, "calc12", "calcVal")),
+        ("courses", column_getter(fieldnames, "courses")),
+        ("score_0_10", column_getter(fieldnames, "score_0_10")),
+        ("raw_score", column_getter(fieldnames, "raw_score", "raw")),
+        ("feature_version", column_getter(fieldnames, "feature_version")),
+        ("resume_chars", column_getter(fieldnames, "resume_chars")),
+    ]
+    g_essay_math = column_getter(fieldnames, "essayMath")
+    g_essay_comm = column_getter(fieldnames, "essayCommunity")
+
+    def convert(row, idx):
+        feats = parse_features(g_features(row))
+        if not feats:
+            return None
+
+        # Coerce to floats
+        try:
+            feats = [float(x) for x in feats]
+        except Exception:
+            return None
+
+        # Expect 21 features (your v2 schema)
+        if len(feats) != 21:
+            return None
+
+        timestamp = g_timestamp(row).strip()
+        uni = g_uni(row).strip()
+
+        if id_mode == "uni_timestamp" and uni and timestamp:
+            applicant_id = f"{uni}_{timestamp}"
+        elif id_mode == "uni_timestamp" and uni:
+            applicant_id = f"{uni}_{idx}"
+        else:
+            applicant_id = str(idx)
+
+        meta = {"name": g_name(row).strip(), "uni": uni}
+        for key, get in stripped:
+            meta[key] = get(row).strip()
+        # keep essays available for humans while labeling (optional)
+        meta["essayMath"] = g_essay_math(row)
+        meta["essayCommunity"] = g_essay_comm(row)
+
+        return {"id": applicant_id, "features": feats, "meta": meta}
+
+    return convert
+
+
+def convert_rows(rows, convert, first_idx=1):
+    """Yield convert(row, idx) for every non-blank row, numbering rows from first_idx.
+
+    csv.DictReader skips blank lines without counting them, so --id-mode row does too.
+    """
+    idx = first_idx - 1
+    for row in rows:
+        if not row:
+            continue
+        idx += 1
+        yield convert(row, idx)
+
+
+def split_records(csv_path: Path, n_chunks: int):
+    """Split the CSV body into byte ranges that start and end on record boundaries.
+
+    A newline ends a record only when it is outside a quoted field, tracked by quote
+    parity per line (escaped quotes come in pairs, so multi-line essays stay intact).
+    Returns (fieldnames, [(start, end, first_idx, n_rows), ...]) where n_rows counts
+    the non-blank records in the range.
+    """
+    size = csv_path.stat().st_size
+    with csv_path.open("rb") as f:
+        header = b""
+        in_quote = False
+        for line in f:
+            header += line
+            if line.count(b'"') % 2:
+                in_quote = not in_quote
+            if not in_quote:
+                break
+        fieldnames = next(csv.reader(io.StringIO(header.decode("utf-8-sig"), newline="")), [])
+
+        pos = len(header)
+        target = max(1 << 20, (size - pos) // max(1, n_chunks) + 1)
+        chunks = []
+        start, first_idx, n_rows = pos, 1, 0
+        rec_blank = True
+        for line in f:
+            pos += len(line)
+            if line.count(b'"') % 2:
+                in_quote = not in_quote
+            if rec_blank and line.strip(b"\r\n"):
+                rec_blank = False
+            if in_quote:
+                continue
+            if not rec_blank:
+                n_rows += 1
+            rec_blank = True
+            if pos - start >= target:
+                chunks.append((start, pos, first_idx, n_rows))
+                start, first_idx, n_rows = pos, first_idx + n_rows, 0
+        if pos > start:
+            chunks.append((start, pos, first_idx, n_rows))
+    return fieldnames, chunks
+
+
+def pack_batch(objs, split_meta=False, dedup=False):
+    """Encode a batch of applicant objects: (jsonl text, ids, flat array('d') of features, meta text, dedup keys).
+
+    With split_meta, the jsonl lines carry only {id, features} and meta goes to a separate
+    {id, meta} text block; otherwise the meta text is empty. With dedup, the last item is
+    dedup.record_keys() per applicant (MinHash included, so workers do the hashing); otherwise None.
+    """
+    if split_meta:
+        text = "".join(_encode({"id": o["id"], "features": o["features"]}) + "\n" for o in objs)
+        meta_text = "".join(_encode({"id": o["id"], "meta": o["meta"]}) + "\n" for o in objs)
+    else:
+        text = "\n".join(_encode(o) for o in objs) + "\n" if objs else ""
+        meta_text = ""
+    feats = array("d")
+    for o in objs:
+        feats.extend(o["features"])
+    keys = [record_keys(o["meta"]) for o in objs] if dedup else None
+    return text, [o["id"] for o in objs], feats, meta_text, keys
+
+
+def write_batch(out, sidecars, batch):
+    text, ids, feats, meta_text, keys = batch
+    out.write(text)
+    if sidecars.get("features_bin") is not None:
+        sidecars["features_bin"].add_batch(ids, feats)
+    if sidecars.get("meta_out") is not None:
+        sidecars["meta_out"].write(meta_text)
+    if sidecars.get("dedup") is not None:
+        sidecars["dedup"].add_batch(ids, keys)
+
+
+def _convert_chunk(task):
+    csv_path, start, end, first_idx, fieldnames, id_mode, split_meta, dedup = task
+    with open(csv_path, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8")
+    convert = make_row_converter(fieldnames, id_mode)
+    objs = []
+    n_rows = n_skip = 0
+    for obj in convert_rows(csv.reader(io.StringIO(text, newline="")), convert, first_idx):
+        n_rows += 1
+        if obj is None:
+            n_skip += 1
+            continue
+        objs.append(obj)
+    return pack_batch(objs, split_meta, dedup), n_skip, n_rows
+
+
+def convert_parallel(csv_path: Path, out, id_mode, workers, sidecars, prof=None):
+    """Convert with a process pool over record-aligned byte ranges; output keeps CSV row order."""
+    fieldnames, chunks = split_records(csv_path, workers * 4)
+    split_meta = sidecars.get("meta_out") is not None
+    dedup = sidecars.get("dedup") is not None
+    tasks = [(str(csv_path), start, end, first_idx, fieldnames, id_mode, split_meta, dedup)
+             for start, end, first_idx, _ in chunks]
+    prof = prof or PhaseProfiler()
+    n_ok = n_skip = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for (_, _, first_idx, expected), (batch, skip, n_rows) in zip(chunks, pool.map(_convert_chunk, tasks)):
+            if n_rows != expected:
+                raise SystemExit(
+                    f"Chunk starting at row {first_idx} parsed {n_rows} rows, expected {expected} "
+                    "(unbalanced quotes in the CSV?). Re-run with --workers 1."
+                )
+            with prof.phase("write"):
+                write_batch(out, sidecars, batch)
+            n_ok += len(batch[1])
+            n_skip += skip
+    return n_ok, n_skip
+
+
+def convert_serial(csv_path: Path, out, id_mode, batch_rows, sidecars, prof=None):
+    prof = prof or PhaseProfiler()
+    split_meta = sidecars.get("meta_out") is not None
+    dedup = sidecars.get("dedup") is not None
+    n_ok, n_skip = 0, 0
+    with csv_path.open("r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        convert = make_row_converter(next(reader, []), id_mode)
+        objs = []
+        for obj in convert_rows(reader, convert):
+            if obj is None:
+                n_skip += 1
+                continue
+            objs.append(obj)
+            n_ok += 1
+            if len(objs) >= batch_rows:
+                with prof.phase("write"):
+                    write_batch(out, sidecars, pack_batch(objs, split_meta, dedup))
+                objs.clear()
+        if objs:
+            with prof.phase("write"):
+                write_batch(out, sidecars, pack_batch(objs, split_meta, dedup))
+    return n_ok, n_skip
+
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("csv_path", help="Submissions CSV (export from Google Sheets)")
     ap.add_argument("--out", required=True, help="Output applicants.jsonl path")
     ap.add_argument("--id-mode", choices=["uni_timestamp", "row"], default="uni_timestamp")
+    ap.add_argument("--batch-rows", type=int, default=1000, help="Applicants buffered per output write")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="Processes for conversion (0 = all CPUs); output order and row ids match --workers 1")
+    ap.add_argument("--features-bin", default="",
+                    help="Also write a binary feature matrix + id index (see feature_store.py) for fast training loads")
+    ap.add_argument("--feature-version", type=int, default=2, help="feature_version recorded in the --features-bin header")
+    ap.add_argument("--meta-out", default="",
+                    help="Write meta (essays etc.) as {id, meta} lines here and keep --out to {id, features} only. "
+                         "The pairwise labeler needs the combined file, so leave this off for labeling exports.")
+    ap.add_argument("--id-map", default="",
+                    help="Detect resubmissions (same UNI or email, or near-identical essays; see dedup.py) and write "
+                         "id,canonical,match rows here. Pass it to train_ranker.py / score_pool.py --id-map "
+                         "to count each person once, as their latest submission")
+    ap.add_argument("--essay-threshold", type=float, default=DEFAULT_THRESHOLD,
+                    help="Estimated essay Jaccard similarity at which two submissions count as one person")
+    add_profile_args(ap)
     args = ap.parse_args()
+    prof = PhaseProfiler.from_args(args)
 
     csv_path = Path(args.csv_path)
     out_path = Path(args.out)
@@ -51,66 +327,42 @@ def main():
 
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    n_ok, n_skip = 0, 0
-    with csv_path.open("r", encoding="utf-8-sig", newline="") as f, out_path.open("w", encoding="utf-8") as out:
-        r = csv.DictReader(f)
-        for idx, row in enumerate(r, start=1):
-            # Your sheet uses these names (from your screenshot):
-            # timestamp, fullName, uni, email, schoolYear, raceEth, gpa, calc12, courses,
-            # score_0_10, raw_score, feature_version, resume_chars, features_json, essayMath, essayCommunity, ...
-            features_raw = first(row, "features_json", "features", "featuresJson", default="")
-            feats = parse_features(features_raw)
-            if not feats:
-                n_skip += 1
-                continue
-
-            # Coerce to floats
-            try:
-                feats = [float(x) for x in feats]
-            except Exception:
-                n_skip += 1
-                continue
-
-            # Expect 21 features (your v2 schema)
-            if len(feats) != 21:
-                n_skip += 1
-                continue
-
-            timestamp = first(row, "timestamp", default="").strip()
-            uni = first(row, "uni", default="").strip()
-            full_name = first(row, "fullName", "fullname", "name", default="").strip()
-
-            if args.id_mode == "uni_timestamp" and uni and timestamp:
-                applicant_id = f"{uni}_{timestamp}"
-            elif args.id_mode == "uni_timestamp" and uni:
-                applicant_id = f"{uni}_{idx}"
-            else:
-                applicant_id = str(idx)
-
-            meta = {
-                "name": full_name,
-                "uni": uni,
-                "email": first(row, "email", default="").strip(),
-                "schoolYear": first(row, "schoolYear", "schoolYearText", default="").strip(),
-                "raceEth": first(row, "raceEth", default="").strip(),
-                "gpa": first(row, "gpa", default="").strip(),
-                "calc12": first(row, "calc12", "calcVal", default="").strip(),
-                "courses": first(row, "courses", default="").strip(),
-                "score_0_10": first(row, "score_0_10", default="").strip(),
-                "raw_score": first(row, "raw_score", "raw", default="").strip(),
-                "feature_version": first(row, "feature_version", default="").strip(),
-                "resume_chars": first(row, "resume_chars", default="").strip(),
-                # keep essays available for humans while labeling (optional)
-                "essayMath": first(row, "essayMath", default=""),
-                "essayCommunity": first(row, "essayCommunity", default=""),
-            }
-
-            obj = {"id": applicant_id, "features": feats, "meta": meta}
-            out.write(json.dumps(obj, ensure_ascii=False) + "\n")
-            n_ok += 1
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    features_bin = FeatureBinWriter(Path(args.features_bin), args.feature_version, 21) if args.features_bin else None
+    meta_out = Path(args.meta_out).open("w", encoding="utf-8") if args.meta_out else None
+    dedup = DedupIndex(args.essay_threshold) if args.id_map else None
+    sidecars = {"features_bin": features_bin, "meta_out": meta_out, "dedup": dedup}
+    t0 = time.perf_counter()
+    # "convert" covers reading, parsing and writing; "write" is the encode + write share of it.
+    with prof.phase("convert"), out_path.open("w", encoding="utf-8") as out:
+        if workers > 1:
+            n_ok, n_skip = convert_parallel(csv_path, out, args.id_mode, workers, sidecars, prof)
+        else:
+            n_ok, n_skip = convert_serial(csv_path, out, args.id_mode, max(1, args.batch_rows), sidecars, prof)
+    with prof.phase("close_sidecars"):
+        if features_bin is not None:
+            features_bin.close()
+            print(f"wrote feature matrix ({features_bin.n} x {features_bin.dim}) to {features_bin.path}")
+        if meta_out is not None:
+            meta_out.close()
+            print(f"wrote applicant meta to {args.meta_out}")
+        if dedup is not None:
+            rows = dedup.id_map()
+            write_id_map(Path(args.id_map), rows)
+            n_people = len({canon for _, canon, _ in rows})
+            print(f"found {len(rows) - n_people} superseded submissions from {n_people} people "
+                  f"-> {args.id_map}")
+            for a, b in dedup.conflicts[:10]:
+                print(f"  essay match not merged (different UNI and email): {a} ~ {b}")
+            if len(dedup.conflicts) > 10:
+                print(f"  ... {len(dedup.conflicts) - 10} more")
 
+    dt = time.perf_counter() - t0
+    rate = (n_ok + n_skip) / dt if dt > 0 else 0.0
     print(f"wrote {n_ok} applicants to {out_path} (skipped {n_skip} rows with missing/bad features_json)")
+    print(f"processed {n_ok + n_skip} rows in {dt:.2f}s ({rate:,.0f} rows/s)")
+    prof.finish(tool="make_applicants_jsonl", rows=n_ok + n_skip, applicants=n_ok, workers=workers)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,34 @@
+"""NumPy is optional for the tools: each fast path checks has_numpy() and falls back to
+pure Python, so results match either way.
+
+  from numpy_support import has_numpy, require_numpy
+  if has_numpy():
+      import numpy as np
+      ...
+  np = require_numpy("--engine numpy")   # paths with no pure-Python fallback
+"""
+
+_available = None
+
+
+def has_numpy():
+    """True if numpy can be imported. Probed once per process, so a missing numpy is not
+    searched for again on every call in a hot loop."""
+    global _available
+    if _available is None:
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            _available = False
+        else:
+            _available = True
+    return _available
+
+
+def require_numpy(what):
+    """The numpy module, or SystemExit naming the option (what) that needs it."""
+    if not has_numpy():
+        raise SystemExit(f"{what} requires numpy (pip install numpy)")
+    import numpy
+
+    return numpy
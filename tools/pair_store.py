@@ -0,0 +1,82 @@
+"""Compact binary pair file: int32 index pairs + int8 labels, with the ID table they index.
+
+Layout (little-endian):
+  0   8s  magic b"PMEPAIR1"
+  8   u32 format version (1)
+  12  u32 n_ids
+  16  u64 n_pairs
+  24  u64 ids_bytes
+  32  n_pairs packed records of (i: i32, j: i32, y: i8), 9 bytes each
+  ..  ids, UTF-8, "\\n"-separated (ids_bytes long)
+
+A pair costs 9 bytes on disk and is streamed back in fixed-size chunks, so tens of
+millions of comparisons never exist as one Python list.
+"""
+
+import struct
+from pathlib import Path
+
+MAGIC = b"PMEPAIR1"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sIIQQ")
+_RECORD = struct.Struct("<iib")
+
+
+def is_pair_store(path: Path) -> bool:
+    with Path(path).open("rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class PairBinWriter:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.index = {}
+        self.n = 0
+        self.f = self.path.open("wb")
+        self.f.write(b"\0" * _HEADER.size)
+
+    def _row(self, id_):
+        r = self.index.get(id_)
+        if r is None:
+            if "\n" in id_:
+                raise ValueError(f"applicant id contains a newline: {id_!r}")
+            r = self.index[id_] = len(self.index)
+        return r
+
+    def add(self, i, j, y):
+        self.f.write(_RECORD.pack(self._row(i), self._row(j), 1 if y == 1 else 0))
+        self.n += 1
+
+    def close(self):
+        id_bytes = "\n".join(self.index).encode("utf-8")
+        self.f.write(id_bytes)
+        self.f.seek(0)
+        self.f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(self.index), self.n, len(id_bytes)))
+        self.f.close()
+
+
+def read_header(f):
+    magic, fmt, n_ids, n_pairs, ids_bytes = _HEADER.unpack(f.read(_HEADER.size))
+    if magic != MAGIC:
+        raise ValueError("not a pair store (bad magic)")
+    if fmt != FORMAT_VERSION:
+        raise ValueError(f"unsupported pair store format {fmt}")
+    return n_ids, n_pairs, ids_bytes
+
+
+def iter_pair_store(path: Path, chunk_pairs=65536):
+    """Yield (i_id, j_id, y) tuples, reading chunk_pairs records at a time."""
+    with Path(path).open("rb") as f:
+        n_ids, n_pairs, ids_bytes = read_header(f)
+        f.seek(_HEADER.size + n_pairs * _RECORD.size)
+        ids = f.read(ids_bytes).decode("utf-8").split("\n") if n_ids else []
+        f.seek(_HEADER.size)
+        left = n_pairs
+        while left:
+            k = min(left, chunk_pairs)
+            buf = f.read(k * _RECORD.size)
+            if len(buf) != k * _RECORD.size:
+                raise ValueError(f"{path}: truncated pair store")
+            for i, j, y in _RECORD.iter_unpack(buf):
+                yield ids[i], ids[j], y
+            left -= k
@@ -0,0 +1,481 @@
+"""Python port of public/features.js (PMEFeatures.buildFeatures, FEATURE_VERSION 2).
+
+Mirrors the JS semantics that matter for identical round6 output: JS whitespace for
+\\s/trim(), UTF-16 string lengths, ASCII-only \\d, Math.round half-up, and Number()
+coercion. Keep KW, FEATURE_NAMES and the scoring curves in sync with features.js.
+"""
+
+import math
+import re
+
+FEATURE_VERSION = 2
+
+FEATURE_NAMES = [
+    "gpa_score_0_10",
+    "calc12_binary_0_or_10",
+    "upper_math_score_0_10",
+
+    "resume_len_log",
+    "resume_has_education",
+    "resume_has_experience",
+    "resume_has_projects",
+    "resume_has_skills",
+
+    "kw_math_engagement",
+    "kw_research_exposition",
+    "kw_teaching_mentoring",
+    "kw_leadership_service",
+    "kw_awards_honors",
+    "kw_competitions",
+
+    "essay_math_len_log",
+    "essay_comm_len_log",
+
+    "essay_math_reasoning_markers",
+    "essay_comm_specificity_markers",
+
+    "essay_math_math_terms",
+    "essay_comm_math_terms",
+
+    "keyword_density_penalty",
+]
+
+# Slots that depend on the resume text (not stored in applicants.jsonl / the sheet).
+RESUME_SLOTS = tuple(range(3, 14)) + (20,)
+
+KW = {
+    "math_engagement": [
+        "problem session", "seminar", "colloquium", "reading group", "math circle", "putnam",
+        "olympiad", "contest", "proof", "theorem", "lemma",
+    ],
+    "research_exposition": [
+        "research", "paper", "preprint", "poster", "presentation", "talk", "expository",
+        "publication", "manuscript", "arxiv", "journal",
+    ],
+    "teaching_mentoring": [
+        "ta", "teaching assistant", "tutor", "tutoring", "mentor", "mentoring", "instructor",
+    ],
+    "leadership_service": [
+        "president", "founder", "cofounder", "chair", "director", "lead", "captain", "organize",
+        "organized", "organizing", "outreach", "volunteer", "service",
+    ],
+    "awards_honors": [
+        "award", "honor", "honours", "scholarship", "fellowship", "recipient", "prize", "winner",
+        "finalist",
+    ],
+    "competitions": [
+        "putnam", "imo", "usamo", "amc", "aime", "icpc", "hackathon", "math competition", "contest",
+    ],
+    "math_terms": [
+        "proof", "theorem", "lemma", "corollary", "define", "assume", "therefore", "hence", "group",
+        "ring", "field", "analysis", "topology", "algebra", "complex", "measure", "probability",
+        "linear", "eigen", "integral", "series", "converge", "holomorphic",
+    ],
+    "reasoning_markers": [
+        "assume", "suppose", "let ", "then", "therefore", "hence", "thus", "it follows", "we claim",
+        "consider",
+    ],
+    "specificity_markers": [
+        "talk", "problem session", "reading group", "workshop", "weekly", "biweekly", "invite",
+        "speaker", "panel", "office hours", "study jam", "problem set", "mini-talk", "minitalk",
+        "chalk talk", "chalktalk", "rsvp",
+    ],
+    "personal_context_markers": [
+        "i grew up", "i come from", "first-gen", "first generation", "financial", "bureaucratic",
+        "stutter", "disability", "overwhelmed", "stress", "struggle", "difficult", "hard", "failure",
+        "doubt",
+    ],
+    "personal_action_markers": [
+        "i started", "i learned", "i taught", "i practiced", "i worked", "i asked", "i joined",
+        "i built", "i wrote", "i proved", "i kept", "i continued",
+    ],
+    "personal_reflection_markers": [
+        "i realized", "i learned that", "it taught me", "since then", "now i", "because of that",
+        "as a result", "i understand", "i changed",
+    ],
+    "plan_markers": [
+        "i would", "i will", "i plan", "i want to", "we could", "we will", "host", "run", "organize",
+        "start", "lead", "facilitate", "schedule", "coordinate",
+    ],
+}
+
+# Resume section markers used inline by buildFeatures (slots 4-7).
+SECTION_KW = {
+    "education": ["education", "coursework", "academic"],
+    "experience": ["experience", "employment", "intern", "internship"],
+    "projects": ["projects", "project"],
+    "skills": ["skills", "technical", "languages", "tools"],
+}
+
+# Buckets summed by densityPenalty (slot 20).
+DENSITY_BUCKETS = (
+    "math_engagement", "research_exposition", "teaching_mentoring", "leadership_service",
+    "awards_honors", "competitions", "math_terms",
+)
+
+# ==========
+# JS compatibility helpers
+# ==========
+_JS_WS = "\t\n\v\f\r \u00a0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000\ufeff"
+_JS_WS_RUN = re.compile(f"[{_JS_WS}]+")
+_SENTENCE_SPLIT = re.compile(r"[.!?]+")
+_COURSE_RE = re.compile(f"^MATH[{_JS_WS}]+(UN|GU|GR|BC)[{_JS_WS}]?([0-9]{{4}})$")
+
+
+def js_trim(s):
+    return s.strip(_JS_WS)
+
+
+def js_len(s):
+    """String length in UTF-16 code units, like JS .length."""
+    return len(s.encode("utf-16-le")) // 2
+
+
+def js_number(x):
+    """Number(x) with None standing in for undefined: '' -> 0, None/unparseable -> NaN."""
+    if x is None:
+        return math.nan
+    if isinstance(x, bool):
+        return float(x)
+    if isinstance(x, (int, float)):
+        return float(x)
+    t = js_trim(str(x))
+    if not t:
+        return 0.0
+    if re.fullmatch(r"[+-]?(Infinity|(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?)", t, re.ASCII):
+        return float(t.replace("Infinity", "inf"))
+    if re.fullmatch(r"0[xX][0-9a-fA-F]+", t):
+        return float(int(t, 16))
+    return math.nan
+
+
+def js_round(x):
+    """Math.round: nearest integer, halves toward +Infinity."""
+    r = math.floor(x)
+    return r + 1 if x - r >= 0.5 else r
+
+
+# ==========
+# Numeric helpers (smooth, bounded, stable)
+# ==========
+def clamp(x, a, b):
+    return max(a, min(b, x))
+
+
+def safe_num(x, fallback=math.nan):
+    v = js_number(x)
+    return v if math.isfinite(v) else fallback
+
+
+def round6(x):
+    return js_round(x * 1e6) / 1e6
+
+
+def sigmoid(z):
+    t = clamp(z, -30, 30)
+    return 1 / (1 + math.exp(-t))
+
+
+def softplus(z):
+    t = clamp(z, -30, 30)
+    return math.log1p(math.exp(t))
+
+
+def sat_exp(x, alpha):
+    return 1 - math.exp(-alpha * max(0, x))
+
+
+def gaussian_band(x, mu, sigma):
+    s = max(1e-6, sigma)
+    u = (x - mu) / s
+    return math.exp(-0.5 * u * u)
+
+
+def log_norm_len(s):
+    n = js_len(js_trim(s or ""))
+    return clamp((math.log1p(n) / math.log(1 + 6000)) * 10, 0, 10)
+
+
+# ==========
+# Text helpers
+# ==========
+def norm_text(s):
+    return js_trim(_JS_WS_RUN.sub(" ", str(s or "").lower()))
+
+
+def contains_any(t, kws):
+    """t must already be norm_text()-normalized."""
+    return any(k in t for k in kws)
+
+
+def count_hits(t, kws):
+    """Unique-hit count (each keyword at most once); t must already be normalized."""
+    return sum(1 for k in kws if k and k in t)
+
+
+class KeywordAutomaton:
+    """Keyword counts over named buckets: count(t) -> {bucket: count_hits(t, bucket)}.
+
+    Below MIN_PATTERNS distinct keywords this is count_hits per bucket: each `k in t` is a
+    C scan, which beats a Python-level automaton while the keyword list is short. At or
+    above it, count() makes one Aho-Corasick pass over t instead, which costs
+    O(len(t) + matches) regardless of how many keywords there are. Both give the same
+    counts.
+    """
+
+    MIN_PATTERNS = 256  # measured crossover on a 12k-char resume is ~200-300 keywords
+
+    def __init__(self, buckets, min_patterns=None):
+        self.bucket_kws = {b: list(kws) for b, kws in buckets.items()}
+        self.buckets = list(buckets)
+        # pattern -> bucket occurrences (a keyword may sit in several buckets, or twice in one)
+        patterns = {}
+        for b, kws in buckets.items():
+            for k in kws:
+                if k:
+                    patterns.setdefault(k, []).append(b)
+        self.patterns = list(patterns)
+        self.pattern_buckets = [patterns[k] for k in self.patterns]
+        limit = self.MIN_PATTERNS if min_patterns is None else min_patterns
+        self._delta = self._out = None
+        if len(self.patterns) >= limit:
+            self._build()
+
+    def _build(self):
+        goto = [{}]
+        out = [[]]
+        for pid, k in enumerate(self.patterns):
+            s = 0
+            for ch in k:
+                nxt = goto[s].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[s][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                s = nxt
+            out[s].append(pid)
+
+        # BFS for failure links, then fold them into a full transition table (DFA) so
+        # the scan never walks failure chains. Characters outside every keyword go to root.
+        fail = [0] * len(goto)
+        delta = [dict(g) for g in goto]
+        queue = list(goto[0].values())
+        for s in queue:
+            for ch, nxt in goto[s].items():
+                queue.append(nxt)
+                f = fail[s] if s else 0
+                fail[nxt] = delta[f].get(ch, 0) if s else 0
+                out[nxt] = out[nxt] + out[fail[nxt]]
+            for ch, nxt in delta[fail[s]].items():
+                delta[s].setdefault(ch, nxt)
+        self._delta = delta
+        self._out = [tuple(o) for o in out]
+
+    def count(self, t):
+        if self._delta is None:
+            return {b: count_hits(t, kws) for b, kws in self.bucket_kws.items()}
+        delta, out = self._delta, self._out
+        found = set()
+        s = 0
+        for ch in t:
+            s = delta[s].get(ch, 0)
+            if out[s]:
+                found.update(out[s])
+        hits = dict.fromkeys(self.buckets, 0)
+        for pid in found:
+            for b in self.pattern_buckets[pid]:
+                hits[b] += 1
+        return hits
+
+
+_SECTION_BUCKETS = {f"section_{k}": v for k, v in SECTION_KW.items()}
+KEYWORDS = KeywordAutomaton({**KW, **_SECTION_BUCKETS})
+
+
+def count_sentences(text):
+    t = js_trim(str(text or ""))
+    if not t:
+        return 0
+    return sum(1 for p in _SENTENCE_SPLIT.split(t) if js_trim(p))
+
+
+def density_penalty(t, hits=None):
+    """t must already be normalized (norm_text of resume + essays); hits = KEYWORDS.count(t)."""
+    n = js_len(t)
+    if n < 200:
+        return 0
+
+    if hits is None:
+        hits = KEYWORDS.count(t)
+    total_hits = 0
+    for bucket in DENSITY_BUCKETS:
+        total_hits += hits[bucket]
+
+    rate = total_hits / (n / 1000)
+    z = (rate - 40) / 8
+    p = softplus(z)
+    scaled = 10 * (1 - math.exp(-0.55 * p))
+    return clamp(scaled, 0, 10)
+
+
+# ==========
+# Academic scoring (0-10)
+# ==========
+def score_gpa(gpa):
+    x = clamp(gpa, 0, 4.33)
+    a = sigmoid((x - 3.55) / 0.18)
+    b = sigmoid((x - 3.85) / 0.10)
+    s = 10 * clamp(0.15 + 0.65 * a + 0.20 * b, 0, 1)
+    return clamp(s, 0, 10)
+
+
+def score_calc(val):
+    return 10 if val == "yes" else 0
+
+
+def score_upper_courses(count, rigor):
+    n = clamp(count if count and not math.isnan(count) else 0, 0, 20)
+    count_score = 10 * sat_exp(n, 0.45)
+    bonus = {"proof": 0.6, "upper": 1.2, "grad": 1.8}.get(rigor, 0)
+    return clamp(count_score + bonus, 0, 10)
+
+
+def _course_points(code_raw):
+    code = _JS_WS_RUN.sub(" ", js_trim(str(code_raw or "")).upper())
+    m = _COURSE_RE.match(code)
+    if not m:
+        return 0
+    lvl, num = m.group(1), int(m.group(2))
+    if lvl == "BC":
+        return 1.0
+    if lvl == "UN":
+        if num >= 3000:
+            return 1.35
+        if num >= 2000:
+            return 1.05
+        return 0.75
+    if lvl == "GU":
+        return 1.70
+    if lvl == "GR":
+        return 2.35 if num >= 6000 else 2.05
+    return 0
+
+
+def score_upper_from_courses(courses):
+    lst = list(courses)[:6] if isinstance(courses, (list, tuple)) else []
+    if not lst:
+        return 0
+    pts = 0
+    for c in lst:
+        pts += _course_points(c)
+    return clamp(10 * sat_exp(pts, 0.55), 0, 10)
+
+
+# ==========
+# Essay scoring for 2-4 sentences (no length reward)
+# ==========
+def bandpass_sentence_score(text):
+    s = count_sentences(text)
+    base = gaussian_band(s, 3, 1.0)
+    non_empty = 1 if js_len(js_trim(str(text or ""))) > 0 else 0
+    score = 10 * clamp(0.12 * non_empty + 0.88 * base, 0, 1)
+    return clamp(score, 0, 10)
+
+
+# The essay scorers take hits = KEYWORDS.count(norm_text(essay)).
+def personal_arc_score(hits):
+    c = 1 if hits["personal_context_markers"] else 0
+    a = 1 if hits["personal_action_markers"] else 0
+    r = 1 if hits["personal_reflection_markers"] else 0
+    raw = (c + a + r) / 3
+    return clamp(10 * sigmoid((raw - 0.55) / 0.12), 0, 10)
+
+
+def plan_specificity_score(hits):
+    plan = 10 * sat_exp(hits["plan_markers"], 0.9)
+    spec = 10 * sat_exp(hits["specificity_markers"], 0.9)
+    return clamp(0.45 * plan + 0.55 * spec, 0, 10)
+
+
+def math_term_score(hits):
+    return clamp(10 * sat_exp(hits["math_terms"], 0.42), 0, 10)
+
+
+def reasoning_marker_score(hits):
+    return clamp(10 * sat_exp(hits["reasoning_markers"], 0.55), 0, 10)
+
+
+# ==========
+# Main: build feature vector
+# ==========
+def build_features(params):
+    """Same inputs as PMEFeatures.buildFeatures: gpa, calcVal, courses (or upperCount/upperRigor),
+    resumeText, essayMath, essayComm. Returns 21 floats rounded to 6 decimals."""
+    gpa = safe_num(params.get("gpa"), math.nan)
+    calc_val = js_trim(params.get("calcVal") or "")
+
+    upper_count_raw = params.get("upperCount")
+    upper_count = 0
+    if math.isfinite(js_number(upper_count_raw)):
+        m = re.match(r"[+-]?[0-9]+", js_trim(str(upper_count_raw)))
+        upper_count = int(m.group(0)) if m else math.nan
+    upper_rigor = js_trim(params.get("upperRigor") or "")
+
+    courses = params.get("courses")
+    courses = courses if isinstance(courses, (list, tuple)) else None
+
+    resume_text = params.get("resumeText") or ""
+    essay_math = params.get("essayMath") or ""
+    essay_comm = params.get("essayComm") or ""
+
+    if not math.isfinite(gpa):
+        raise ValueError("Invalid GPA")
+    if not calc_val:
+        raise ValueError("Missing calcVal")
+
+    # One automaton pass per normalized text yields every bucket count.
+    rh = KEYWORDS.count(norm_text(resume_text))
+    eh = KEYWORDS.count(norm_text(essay_math))
+    ch = KEYWORDS.count(norm_text(essay_comm))
+
+    f = []
+
+    # ---- Academic ----
+    f.append(score_gpa(gpa))
+    f.append(score_calc(calc_val))
+    if courses is not None:
+        f.append(score_upper_from_courses(courses))
+    else:
+        f.append(score_upper_courses(upper_count, upper_rigor or "standard"))
+
+    # ---- Resume structure + length ----
+    f.append(log_norm_len(resume_text))
+    f.append(10 if rh["section_education"] else 0)
+    f.append(10 if rh["section_experience"] else 0)
+    f.append(10 if rh["section_projects"] else 0)
+    f.append(10 if rh["section_skills"] else 0)
+
+    # ---- Resume keywords (unique-hit saturation) ----
+    f.append(clamp(10 * sat_exp(rh["math_engagement"], 0.35), 0, 10))
+    f.append(clamp(10 * sat_exp(rh["research_exposition"], 0.35), 0, 10))
+    f.append(clamp(10 * sat_exp(rh["teaching_mentoring"], 0.55), 0, 10))
+    f.append(clamp(10 * sat_exp(rh["leadership_service"], 0.40), 0, 10))
+    f.append(clamp(10 * sat_exp(rh["awards_honors"], 0.40), 0, 10))
+    f.append(clamp(10 * sat_exp(rh["competitions"], 0.55), 0, 10))
+
+    # ---- Essays (2-4 sentences) ----
+    f.append(bandpass_sentence_score(essay_math))
+    f.append(bandpass_sentence_score(essay_comm))
+    f.append(clamp(0.70 * personal_arc_score(eh) + 0.30 * reasoning_marker_score(eh), 0, 10))
+    f.append(plan_specificity_score(ch))
+    f.append(math_term_score(eh))
+    f.append(math_term_score(ch))
+
+    # ---- Penalty (learnable feature) ----
+    f.append(density_penalty(norm_text(resume_text + "\n" + essay_math + "\n" + essay_comm)))
+
+    if len(f) != len(FEATURE_NAMES):
+        raise ValueError(f"Feature length mismatch: got {len(f)}, expected {len(FEATURE_NAMES)}")
+
+    return [round6(clamp(v, 0, 10)) for v in f]
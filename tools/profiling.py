@@ -0,0 +1,116 @@
+"""Per-phase wall time, CPU time and peak RSS for the tools CLIs (--profile [--profile-out PATH] / --pstats).
+
+  prof = PhaseProfiler.from_args(args)
+  with prof.phase("load_applicants"):
+      ...
+  prof.finish(tool="train_ranker")   # one JSON line to stdout or appended to --profile-out PATH
+
+Phases may repeat (times accumulate and `calls` counts them) or nest (an inner phase's
+time is also part of the outer one). CPU time includes finished child processes, so
+process-pool work is counted. peak_rss_mb is the process high-water mark when the phase
+ended, the larger of this process and its finished children; it is null where the
+resource module is unavailable (Windows).
+"""
+
+import cProfile
+import json
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _cpu_seconds():
+    t = time.process_time()
+    if resource is not None:
+        ru = resource.getrusage(resource.RUSAGE_CHILDREN)
+        t += ru.ru_utime + ru.ru_stime
+    return t
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere.
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+class PhaseProfiler:
+    def __init__(self, enabled=False, dest="-", pstats_path=""):
+        self.enabled = enabled
+        self.dest = dest
+        self.pstats_path = pstats_path
+        self.phases = {}
+        self._t0 = time.perf_counter()
+        self._cpu0 = _cpu_seconds()
+        self._cprofile = None
+        if pstats_path:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    @classmethod
+    def from_args(cls, args):
+        """Build from the --profile / --profile-out PATH / --pstats PATH options added by add_profile_args()."""
+        return cls(args.profile or bool(args.profile_out), args.profile_out or "-", args.pstats)
+
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+        t0 = time.perf_counter()
+        c0 = _cpu_seconds()
+        try:
+            yield
+        finally:
+            rec = self.phases.get(name)
+            if rec is None:
+                rec = self.phases[name] = {"wall_s": 0.0, "cpu_s": 0.0, "calls": 0}
+            rec["wall_s"] += time.perf_counter() - t0
+            rec["cpu_s"] += _cpu_seconds() - c0
+            rec["calls"] += 1
+            rec["peak_rss_mb"] = peak_rss_mb()
+
+    def report(self, **extra):
+        phases = {name: dict(r, wall_s=round(r["wall_s"], 6), cpu_s=round(r["cpu_s"], 6))
+                  for name, r in self.phases.items()}
+        out = dict(extra)
+        out.update({
+            "ts": round(time.time(), 3),
+            "wall_s": round(time.perf_counter() - self._t0, 6),
+            "cpu_s": round(_cpu_seconds() - self._cpu0, 6),
+            "peak_rss_mb": peak_rss_mb(),
+            "phases": phases,
+        })
+        return out
+
+    def finish(self, **extra):
+        """Stop cProfile (writing --pstats) and emit the JSON line; a no-op unless profiling."""
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self.pstats_path)
+            self._cprofile = None
+            print(f"wrote profile stats -> {self.pstats_path}")
+        if not self.enabled:
+            return
+        line = json.dumps(self.report(**extra), separators=(",", ":"))
+        if self.dest == "-":
+            print(line, flush=True)
+        else:
+            with open(self.dest, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def add_profile_args(ap):
+    ap.add_argument("--profile", action="store_true",
+                    help="Record wall/CPU time and peak RSS per phase and print one JSON line")
+    ap.add_argument("--profile-out", default="", metavar="PATH",
+                    help="Append the --profile JSON line to PATH instead of printing it (implies --profile)")
+    ap.add_argument("--pstats", default="", metavar="PATH",
+                    help="Run the whole command under cProfile and dump pstats here (inspect with python -m pstats PATH)")
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Propose the next K pairs to label: the comparisons the current model is least sure about.
+
+A pair's informativeness is p(1 - p) with p = sigmoid(s_i - s_j), where s = w·x is the
+rank.js raw score. The bias is left out because it only models which side was shown
+first. p(1 - p) is largest for applicants with close scores, so the candidates are each
+applicant's --window nearest neighbors in sorted-score order. That gives O(n * window)
+candidates instead of all O(n^2) pairs.
+
+Coverage:
+  1. Every applicant with fewer than --min-per-applicant comparisons gets its most
+     informative available partner, least-compared applicants first. Already labeled
+     pairs count toward this.
+  2. The remaining slots go to the most informative candidates overall.
+  No applicant appears in more than --max-per-applicant proposals. Pairs already in
+  --labeled are never proposed.
+
+The output CSV (i,j,p,raw_i,raw_j) loads into pairwise_labeler.html as a proposal queue.
+Sides are shuffled so the model's favourite is not always on the left.
+
+  python tools/propose_pairs.py --applicants data/applicants.jsonl --model public/model/rank_model.json \\
+      --labeled tools/pairs.csv --k 200 --out proposals.csv
+"""
+
+import argparse
+import csv
+import heapq
+import math
+import random
+import time
+from array import array
+from pathlib import Path
+
+import train_ranker as tr
+from score_pool import raw_scores
+
+
+def pair_key(a, b):
+    return (a, b) if a < b else (b, a)
+
+
+def informativeness(d):
+    """p(1 - p) for p = sigmoid(d), clipped like train()."""
+    if d > 35 or d < -35:
+        return 0.0
+    p = 1.0 / (1.0 + math.exp(-d))
+    return p * (1.0 - p)
+
+
+def candidates(ids, scores, window):
+    """[(p(1-p), a, b)] for each applicant and its next `window` neighbors by score."""
+    order = sorted(range(len(ids)), key=scores.__getitem__)
+    out = []
+    for r, a in enumerate(order):
+        sa = scores[a]
+        for b in order[r + 1:r + 1 + window]:
+            out.append((informativeness(scores[b] - sa), a, b))
+    return out
+
+
+def propose(ids, scores, labeled, k, window=20, min_per=1, max_per=4):
+    """Pick up to k (a, b) index pairs; labeled is a set of pair_key(id_a, id_b)."""
+    count = [0] * len(ids)
+    index = {id_: n for n, id_ in enumerate(ids)}
+    for a_id, b_id in labeled:
+        for id_ in (a_id, b_id):
+            n = index.get(id_)
+            if n is not None:
+                count[n] += 1
+
+    cands = [c for c in candidates(ids, scores, window) if pair_key(ids[c[1]], ids[c[2]]) not in labeled]
+    cands.sort(key=lambda c: -c[0])
+    by_applicant = [[] for _ in ids]
+    for rank, (_, a, b) in enumerate(cands):
+        by_applicant[a].append(rank)
+        by_applicant[b].append(rank)
+
+    chosen = []
+    taken = set()
+    picked = [0] * len(ids)
+
+    def take(rank):
+        _, a, b = cands[rank]
+        if rank in taken or picked[a] >= max_per or picked[b] >= max_per:
+            return False
+        taken.add(rank)
+        chosen.append((a, b))
+        for n in (a, b):
+            picked[n] += 1
+            count[n] += 1
+        return True
+
+    # 1. Coverage: least-compared applicants first, each with its best available partner.
+    need = [(count[n], n) for n in range(len(ids)) if count[n] < min_per]
+    heapq.heapify(need)
+    while need and len(chosen) < k:
+        c, n = heapq.heappop(need)
+        if count[n] != c:
+            if count[n] < min_per:
+                heapq.heappush(need, (count[n], n))
+            continue
+        if any(take(rank) for rank in by_applicant[n]):
+            if count[n] < min_per:
+                heapq.heappush(need, (count[n], n))
+
+    # 2. Fill with the most informative remaining candidates.
+    for rank in range(len(cands)):
+        if len(chosen) >= k:
+            break
+        take(rank)
+    return chosen
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--applicants", required=True, help="applicants.jsonl or its --features-bin sidecar")
+    ap.add_argument("--model", required=True, help="Current rank_model.json")
+    ap.add_argument("--labeled", nargs="*", default=[], help="pairs.csv / pairs.jsonl files already labeled")
+    ap.add_argument("--k", type=int, default=100, help="Number of pairs to propose")
+    ap.add_argument("--window", type=int, default=20, help="Neighbors in sorted-score order considered per applicant")
+    ap.add_argument("--min-per-applicant", type=int, default=1,
+                    help="Try to give every applicant at least this many comparisons (labeled + proposed)")
+    ap.add_argument("--max-per-applicant", type=int, default=4, help="Cap on proposals involving one applicant")
+    ap.add_argument("--seed", type=int, default=0, help="Seed for shuffling left/right sides")
+    ap.add_argument("--out", default="proposals.csv")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    model = tr.load_model(Path(args.model))
+    w = [float(v) for v in model["weights"]]
+    id2x = tr.load_applicants(Path(args.applicants))
+    ids = [id_ for id_, x in id2x.items() if len(x) == len(w)]
+    if len(ids) < 2:
+        raise SystemExit(f"Need at least 2 applicants with {len(w)} features in {args.applicants}")
+    scores = raw_scores(array("d", (v for id_ in ids for v in id2x[id_])), w)
+
+    labeled = set()
+    for p in args.labeled:
+        for i, j, _ in tr.iter_pairs(Path(p)):
+            labeled.add(pair_key(i, j))
+
+    chosen = propose(ids, scores, labeled, args.k, max(1, args.window),
+                     args.min_per_applicant, max(1, args.max_per_applicant))
+
+    rng = random.Random(args.seed)
+    with Path(args.out).open("w", encoding="utf-8", newline="") as f:
+        out = csv.writer(f)
+        out.writerow(["i", "j", "p", "raw_i", "raw_j"])
+        for a, b in chosen:
+            if rng.random() < 0.5:
+                a, b = b, a
+            p = 1.0 / (1.0 + math.exp(-max(-35.0, min(35.0, scores[a] - scores[b]))))
+            out.writerow([ids[a], ids[b], f"{p:.4f}", repr(scores[a]), repr(scores[b])])
+
+    covered = len({n for pair in chosen for n in pair})
+    mean_u = sum(informativeness(scores[a] - scores[b]) for a, b in chosen) / max(1, len(chosen))
+    print(f"Proposed {len(chosen)} pairs over {covered} applicants (mean p(1-p)={mean_u:.3f}, "
+          f"{len(labeled)} labeled pairs excluded) in {time.perf_counter() - t0:.2f}s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Recompute FEATURE_VERSION 2 features offline (pme_features.py) and verify stored ones.
+
+Input is applicants.jsonl or the submissions CSV (rows are read through
+make_applicants_jsonl.py, so rows without parseable stored features are skipped there too).
+
+Resume text is not stored in the sheet, so resume-dependent slots (3-13 and the density
+penalty, 20) are only recomputed when --resume-dir has <id>.txt or <uni>.txt for that
+applicant; otherwise the stored values are kept and not checked. check_features_parity.py
+checks pme_features itself against public/features.js.
+
+  python tools/refeaturize.py data/applicants.jsonl --check
+  python tools/refeaturize.py export.csv --resume-dir resumes/ --out applicants_v2.jsonl
+"""
+
+import argparse
+import csv
+import json
+import sys
+from pathlib import Path
+
+import pme_features as pf
+
+
+def iter_applicants(path: Path):
+    if path.suffix.lower() == ".csv":
+        from make_applicants_jsonl import convert_rows, make_row_converter
+
+        with path.open("r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.reader(f)
+            convert = make_row_converter(next(reader, []), "uni_timestamp")
+            for obj in convert_rows(reader, convert):
+                if obj is not None:
+                    yield obj
+        return
+
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def params_from_meta(meta, resume_text):
+    """Map the sheet/meta fields back to PMEFeatures.buildFeatures params."""
+    courses = [c.strip() for c in str(meta.get("courses") or "").split(";")]
+    return {
+        "gpa": meta.get("gpa"),
+        "calcVal": meta.get("calc12") or "",
+        "courses": [c for c in courses if c],
+        "resumeText": resume_text or "",
+        "essayMath": meta.get("essayMath") or "",
+        "essayComm": meta.get("essayCommunity") or "",
+    }
+
+
+def find_resume(resume_dir, obj):
+    if resume_dir is None:
+        return None
+    for stem in (obj.get("id"), (obj.get("meta") or {}).get("uni")):
+        if stem:
+            p = resume_dir / f"{stem}.txt"
+            if p.exists():
+                return p.read_text(encoding="utf-8")
+    return None
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("input", help="applicants.jsonl or submissions CSV")
+    ap.add_argument("--out", default="", help="Write applicants.jsonl with recomputed features")
+    ap.add_argument("--resume-dir", default="", help="Directory of <id>.txt / <uni>.txt resume text")
+    ap.add_argument("--check", action="store_true", help="Exit 1 if any recomputed slot differs from the stored features")
+    args = ap.parse_args()
+
+    resume_dir = Path(args.resume_dir) if args.resume_dir else None
+    dim = len(pf.FEATURE_NAMES)
+    mismatches = [0] * dim
+    checked = [0] * dim
+    n = n_err = n_resume = 0
+    examples = []
+
+    out = Path(args.out).open("w", encoding="utf-8") if args.out else None
+    try:
+        for obj in iter_applicants(Path(args.input)):
+            n += 1
+            meta = obj.get("meta") or {}
+            stored = obj.get("features")
+            resume_text = find_resume(resume_dir, obj)
+            try:
+                feats = pf.build_features(params_from_meta(meta, resume_text))
+            except ValueError as e:
+                n_err += 1
+                print(f"{obj.get('id')}: {e}", file=sys.stderr)
+                continue
+
+            slots = range(dim)
+            if resume_text is None:
+                slots = [k for k in slots if k not in pf.RESUME_SLOTS]
+                if isinstance(stored, list) and len(stored) == dim:
+                    for k in pf.RESUME_SLOTS:
+                        feats[k] = float(stored[k])
+            else:
+                n_resume += 1
+
+            if isinstance(stored, list) and len(stored) == dim:
+                for k in slots:
+                    checked[k] += 1
+                    if float(stored[k]) != feats[k]:
+                        mismatches[k] += 1
+                        if len(examples) < 5:
+                            examples.append(f"{obj.get('id')} {pf.FEATURE_NAMES[k]}: stored={stored[k]} recomputed={feats[k]}")
+
+            if out is not None:
+                obj["features"] = feats
+                out.write(json.dumps(obj, ensure_ascii=False) + "\n")
+    finally:
+        if out is not None:
+            out.close()
+
+    print(f"recomputed {n - n_err} applicants ({n_resume} with resume text, {n_err} errors)")
+    for k, name in enumerate(pf.FEATURE_NAMES):
+        if checked[k]:
+            print(f"  {k:2d} {name:32s} checked={checked[k]:6d} mismatched={mismatches[k]}")
+    for line in examples:
+        print(f"  e.g. {line}")
+    if args.out:
+        print(f"wrote -> {args.out}")
+    if args.check and any(mismatches):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""Score a whole applicant pool with rank_model.json, matching PMERanker in the browser.
+
+raw score     w · x accumulated feature by feature in float64 (the same order and
+              rounding as rank.js dot()), so it equals PMERanker.scoreRaw bit for bit.
+              The root rank.js ignores the model's bias; public/rank.js adds it
+              (--use-bias).
+score_0_10    PMERanker.percentileScore against the whole pool: the number of pool raw
+              scores strictly below, / (n - 1), times 10, rounded to one decimal with
+              Math.round (halves up). A pool of one scores 5.0. With --calibration the
+              pool is a shipped rank_calibration.json instead (see calibration.py);
+              --calibration-out writes one from this pool.
+rank          1 for the highest raw score; ties share the best rank (1, 2, 2, 4).
+
+Every row counts, as in loadPoolRawScores, so repeated IDs are scored separately.
+--id-map drops resubmissions first, keeping each person's latest row (see dedup.py).
+Rows whose feature count differs from the model's are skipped (public/rank.js throws
+on them and loadPoolRawScores drops the line).
+
+  python tools/score_pool.py --model public/model/rank_model.json --applicants data/applicants.jsonl --out ranked.jsonl
+  python tools/score_pool.py --model rank_model.json --applicants applicants.bin --out ranked.csv
+"""
+
+import argparse
+import csv
+import json
+import time
+from array import array
+from pathlib import Path
+
+import train_ranker as tr
+from calibration import Calibrator, build_table, js_round1, load_table, save_table
+from dedup import load_id_map
+from feature_store import FeatureStore, is_feature_store
+from numpy_support import has_numpy
+
+
+def load_pool(path: Path, dim):
+    """(ids, flat array('d') of n * dim features, skipped rows) in file order."""
+    if is_feature_store(path):
+        store = FeatureStore(path)
+        if store.dim != dim:
+            return [], array("d"), len(store.ids)
+        return store.ids, store.matrix, 0
+    ids = []
+    X = array("d")
+    skipped = 0
+    for id_, x in tr.iter_applicants_jsonl(path):
+        if len(x) != dim:
+            skipped += 1
+            continue
+        try:
+            row = [float(v) for v in x]
+        except (TypeError, ValueError):
+            skipped += 1
+            continue
+        X.extend(row)
+        ids.append(id_)
+    return ids, X, skipped
+
+
+def canonical_rows(ids, X, dim, id_map):
+    """Keep only rows whose id is canonical in id_map (each person's latest submission)."""
+    keep = [r for r, id_ in enumerate(ids) if id_map.get(id_, id_) == id_]
+    if len(keep) == len(ids):
+        return ids, X
+    out = array("d")
+    for r in keep:
+        out.extend(X[r * dim:(r + 1) * dim])
+    return [ids[r] for r in keep], out
+
+
+def raw_scores(X, w, bias=0.0):
+    """rank.js dot(w, x) (+ bias) for every row of the flat matrix X, as a list of floats."""
+    dim = len(w)
+    n = len(X) // dim if dim else 0
+    if has_numpy():
+        import numpy as np
+
+        M = np.frombuffer(X, dtype=np.float64).reshape(n, dim) if n else np.zeros((0, dim))
+        s = np.zeros(n)
+        # Column by column keeps the per-row summation order of the JS loop (BLAS would not).
+        for k in range(dim):
+            s += w[k] * M[:, k]
+        if bias:
+            s += bias
+        return s.tolist()
+    out = []
+    for r in range(n):
+        s = 0.0
+        base = r * dim
+        for k in range(dim):
+            s += w[k] * X[base + k]
+        out.append(s + bias if bias else s)
+    return out
+
+
+def percentiles_and_ranks(raw):
+    """percentileScore(raw[i], raw) and the 1-based competition rank for every score, as lists."""
+    n = len(raw)
+    if n <= 1:
+        return [5.0] * n, [1] * n
+    if has_numpy():
+        import numpy as np
+
+        s = np.asarray(raw, dtype=np.float64)
+        asc = np.sort(s)
+        below = np.searchsorted(asc, s, side="left")
+        y = below / (n - 1) * 10 * 10
+        r = np.floor(y)
+        pct = (r + (y - r >= 0.5)) / 10
+        rank = n - np.searchsorted(asc, s, side="right") + 1
+        return pct.tolist(), rank.tolist()
+    order = sorted(range(n), key=raw.__getitem__)
+    below = [0] * n
+    above = [0] * n
+    k = 0
+    while k < n:
+        e = k
+        while e + 1 < n and raw[order[e + 1]] == raw[order[k]]:
+            e += 1
+        for t in range(k, e + 1):
+            below[order[t]] = k
+            above[order[t]] = n - 1 - e
+        k = e + 1
+    return [js_round1(b / (n - 1) * 10) for b in below], [a + 1 for a in above]
+
+
+def table_percentiles(raw, cal: Calibrator):
+    """cal.percentile() for every raw score."""
+    if not has_numpy():
+        return [cal.percentile(r) for r in raw]
+    import numpy as np
+
+    if cal.n == 0:
+        return [5.0] * len(raw)
+    if cal.n <= 1:
+        return [js_round1(0.5 * 10)] * len(raw)
+    below = np.asarray(cal.below, dtype=np.float64)[np.searchsorted(np.asarray(cal.values), np.asarray(raw), side="left")]
+    y = below / (cal.n - 1) * 10 * 10
+    r = np.floor(y)
+    return ((r + (y - r >= 0.5)) / 10).tolist()
+
+
+def write_ranked(path: Path, ids, raw, pct, rank):
+    order = sorted(range(len(ids)), key=rank.__getitem__)
+    if path.suffix.lower() == ".csv":
+        with path.open("w", encoding="utf-8", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["rank", "id", "raw", "score_0_10"])
+            for i in order:
+                w.writerow([rank[i], ids[i], repr(raw[i]), pct[i]])
+        return
+    enc = json.JSONEncoder(ensure_ascii=False).encode
+    with path.open("w", encoding="utf-8") as f:
+        batch = []
+        for i in order:
+            # Same text as enc({...}) for finite floats, without building a dict per row.
+            batch.append(f'{{"id": {enc(ids[i])}, "raw": {raw[i]!r}, "score_0_10": {pct[i]!r}, "rank": {rank[i]}}}')
+            if len(batch) >= 10000:
+                f.write("\n".join(batch) + "\n")
+                batch.clear()
+        if batch:
+            f.write("\n".join(batch) + "\n")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model", required=True, help="rank_model.json (weights / bias)")
+    ap.add_argument("--applicants", required=True, help="applicants.jsonl or its --features-bin sidecar")
+    ap.add_argument("--out", required=True, help="Ranked output: .csv, otherwise JSONL")
+    ap.add_argument("--use-bias", action="store_true",
+                    help="Add the model bias like public/rank.js (the root rank.js ignores it; ranks are unaffected)")
+    ap.add_argument("--calibration", default="",
+                    help="Percentiles against this rank_calibration.json instead of the scored pool itself")
+    ap.add_argument("--calibration-out", default="",
+                    help="Write this pool's calibration table (ship it next to rank_model.json)")
+    ap.add_argument("--id-map", default="",
+                    help="make_applicants_jsonl.py --id-map file: score only each person's latest submission")
+    args = ap.parse_args()
+
+    model = tr.load_model(Path(args.model))
+    w = [float(v) for v in model["weights"]]
+    bias = float(model.get("bias") or 0.0) if args.use_bias else 0.0
+
+    t0 = time.perf_counter()
+    ids, X, skipped = load_pool(Path(args.applicants), len(w))
+    if not ids:
+        raise SystemExit(f"No applicants with {len(w)} features in {args.applicants} ({skipped} skipped)")
+    superseded = 0
+    if args.id_map:
+        n = len(ids)
+        ids, X = canonical_rows(ids, X, len(w), load_id_map(Path(args.id_map)))
+        superseded = n - len(ids)
+    t1 = time.perf_counter()
+    raw = raw_scores(X, w, bias)
+    pct, rank = percentiles_and_ranks(raw)
+    if args.calibration:
+        table = load_table(Path(args.calibration))
+        if bool(table.get("includes_bias")) != args.use_bias:
+            raise SystemExit(f"{args.calibration} was built {'with' if table.get('includes_bias') else 'without'} "
+                             "the bias; match --use-bias")
+        if table.get("feature_version") != model.get("feature_version"):
+            raise SystemExit(f"{args.calibration} feature_version {table.get('feature_version')} "
+                             f"!= model {model.get('feature_version')}")
+        pct = table_percentiles(raw, Calibrator(table))
+    if args.calibration_out:
+        save_table(Path(args.calibration_out), build_table(raw, model.get("feature_version"), args.use_bias))
+    t2 = time.perf_counter()
+    write_ranked(Path(args.out), ids, raw, pct, rank)
+    t3 = time.perf_counter()
+    print(f"Scored {len(ids)} applicants ({skipped} skipped: wrong feature count"
+          + (f", {superseded} superseded submissions" if args.id_map else "") + f") -> {args.out}")
+    print(f"load {t1 - t0:.2f}s, score {t2 - t1:.2f}s, write {t3 - t2:.2f}s")
+    if args.calibration_out:
+        print(f"Wrote calibration table -> {args.calibration_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""Cross-validated hyperparameter sweep for train_ranker.py.
+
+Applicants are hashed into k folds. For fold f, the held-out set is the pairs whose two
+applicants are both in f, and the training set is the pairs that touch no applicant in f.
+Pairs that cross the boundary are dropped for that fold, so no held-out applicant is seen
+in training. Every (l2, lr, epochs) configuration is trained on every fold across a
+process pool. --optimizer lbfgs reads only l2, so then only --l2 is swept.
+
+Held-out metrics:
+  accuracy  fraction of pairs ordered correctly by w·(xi - xj) (ties count half; the
+            bias cancels when applicants are ranked by score, so it is left out here)
+  log_loss  mean log(1 + exp(-y' (w·(xi - xj) + b))), the training loss without l2
+
+The best configuration (lowest log-loss by default) is retrained on all pairs and saved
+in train_ranker.save_model's format.
+
+  python tools/sweep_ranker.py --applicants tools/applicants.jsonl --pairs tools/pairs.csv \\
+      --l2 0.0001,0.001,0.01 --lr 0.01,0.02,0.05 --epochs 30,60 --folds 5 --out best_model.json
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import itertools
+import json
+import os
+import random
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import train_ranker as tr
+
+
+def fold_of(id_, k, seed=0):
+    """Stable fold assignment for an applicant ID (independent of pair order)."""
+    h = hashlib.blake2b(f"{seed}:{id_}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(h, "little") % k
+
+
+def split_folds(id2x, pairs, k, dim, seed=0, typecode="d"):
+    """One pass over pairs -> [(train D, Y), (test D, Y)] per fold, plus counts of unusable pairs."""
+    folds = [[(array(typecode), array("b")), (array(typecode), array("b"))] for _ in range(k)]
+    fold = {}
+    dropped = crossing = 0
+    for i, j, y01 in pairs:
+        xi = id2x.get(i)
+        xj = id2x.get(j)
+        if xi is None or xj is None or len(xi) != dim or len(xj) != dim:
+            dropped += 1
+            continue
+        fi = fold.get(i)
+        if fi is None:
+            fi = fold[i] = fold_of(i, k, seed)
+        fj = fold.get(j)
+        if fj is None:
+            fj = fold[j] = fold_of(j, k, seed)
+        if fi != fj:
+            crossing += 1
+        d = [a - b_ for a, b_ in zip(xi, xj)]
+        y = 1 if y01 == 1 else -1
+        for f in range(k):
+            if f == fi == fj:
+                part = folds[f][1]
+            elif f != fi and f != fj:
+                part = folds[f][0]
+            else:
+                continue
+            part[0].extend(d)
+            part[1].append(y)
+    return folds, dropped, crossing
+
+
+def parse_list(text, cast):
+    return [cast(v) for v in text.split(",") if v.strip()]
+
+
+# Hyperparameters each optimizer actually reads; the others are not swept.
+GRID_AXES = {"sgd": ("l2", "lr", "epochs"), "adam": ("l2", "lr", "epochs"), "lbfgs": ("l2",)}
+
+
+def make_configs(axes, sample=0, seed=0):
+    """Grid over {name: values}, e.g. {"l2": [...], "lr": [...]}."""
+    names = list(axes)
+    grid = [dict(zip(names, vals)) for vals in itertools.product(*(axes[k] for k in names))]
+    if sample and sample < len(grid):
+        grid = random.Random(seed).sample(grid, sample)
+    return grid
+
+
+def train_quiet(D, Y, config, base):
+    args = argparse.Namespace(**dict(base, **config))
+    with contextlib.redirect_stdout(io.StringIO()):
+        return tr.fit(D, Y, args)
+
+
+_folds = None
+_base = None
+
+
+def _init_worker(folds, base):
+    global _folds, _base
+    _folds, _base = folds, base
+
+
+def _run_task(task):
+    """Train one configuration on one fold; returns (config index, fold, metrics)."""
+    ci, config, f = task
+    (Dtr, Ytr), (Dte, Yte) = _folds[f]
+    w, b = train_quiet(Dtr, Ytr, config, _base)
+    return ci, f, tr.pair_metric_sums(Dte, Yte, _base["dim"], w, b)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--applicants", required=True, help="Path to applicants.jsonl or its --features-bin sidecar")
+    ap.add_argument("--pairs", required=True, help="pairs.csv, pairs.jsonl, or a compact pair file")
+    ap.add_argument("--out", default="", help="Write the best configuration, retrained on all pairs, here")
+    ap.add_argument("--results", default="", help="Write per-configuration metrics as JSON")
+    ap.add_argument("--feature-version", type=int, default=2)
+    ap.add_argument("--dim", type=int, default=21)
+    ap.add_argument("--l2", default="0.0001,0.001,0.01", help="Comma-separated l2 values")
+    ap.add_argument("--lr", default="0.01,0.02,0.05", help="Comma-separated learning rates")
+    ap.add_argument("--epochs", default="30,60", help="Comma-separated epoch counts")
+    ap.add_argument("--sample", type=int, default=0, help="Try a random sample of this many grid points (0 = whole grid)")
+    ap.add_argument("--folds", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=0, help="Seed for fold assignment and --sample")
+    ap.add_argument("--metric", choices=["log_loss", "accuracy"], default="log_loss", help="How the best configuration is chosen")
+    ap.add_argument("--workers", type=int, default=0, help="Processes (0 = all CPUs)")
+    ap.add_argument("--engine", choices=["python", "numpy"], default="python")
+    ap.add_argument("--optimizer", choices=["sgd", "adam", "lbfgs"], default="sgd",
+                    help="Passed to train_ranker.fit; lbfgs ignores --lr and --epochs, so they are not swept")
+    ap.add_argument("--batch-size", type=int, default=0, help="As in train_ranker.py (0 = auto)")
+    ap.add_argument("--max-iter", type=int, default=200)
+    ap.add_argument("--tol", type=float, default=1e-6)
+    ap.add_argument("--rtol", type=float, default=1e-10)
+    args = ap.parse_args()
+
+    if args.folds < 2:
+        raise SystemExit("--folds must be at least 2")
+    values = {"l2": parse_list(args.l2, float), "lr": parse_list(args.lr, float), "epochs": parse_list(args.epochs, int)}
+    axes = {k: values[k] for k in GRID_AXES[args.optimizer]}
+    configs = make_configs(axes, args.sample, args.seed)
+    if not configs:
+        raise SystemExit("Empty grid: give at least one " + ", ".join(f"--{k}" for k in axes) + " value")
+    base = {"dim": args.dim, "engine": args.engine, "optimizer": args.optimizer, "batch_size": args.batch_size,
+            "max_iter": args.max_iter, "tol": args.tol, "rtol": args.rtol}
+
+    id2x = tr.load_applicants(Path(args.applicants))
+    fv = getattr(id2x, "feature_version", args.feature_version)
+    if fv != args.feature_version:
+        raise SystemExit(f"{args.applicants} has feature_version {fv}, expected {args.feature_version}")
+    folds, dropped, crossing = split_folds(id2x, tr.iter_pairs(Path(args.pairs)), args.folds, args.dim, args.seed)
+    for f, ((_, Ytr), (_, Yte)) in enumerate(folds):
+        if not len(Ytr) or not len(Yte):
+            raise SystemExit(f"Fold {f} has {len(Ytr)} training / {len(Yte)} held-out pairs; use fewer --folds")
+    print(f"Loaded {len(id2x)} applicants; {args.folds} folds, held-out pairs per fold: "
+          f"{[len(te[1]) for _, te in folds]} ({crossing} cross-fold pairs used for training only, {dropped} dropped)")
+
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    tasks = [(ci, c, f) for ci, c in enumerate(configs) for f in range(args.folds)]
+    totals = [[0.0, 0, 0.0] for _ in configs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=_init_worker,
+                             initargs=(folds, base)) as pool:
+        for ci, _, (correct, n, loss) in pool.map(_run_task, tasks):
+            t = totals[ci]
+            t[0] += correct
+            t[1] += n
+            t[2] += loss
+
+    results = []
+    for config, (correct, n, loss) in zip(configs, totals):
+        results.append(dict(config, accuracy=correct / n, log_loss=loss / n, held_out_pairs=n))
+    if args.metric == "accuracy":
+        results.sort(key=lambda r: (-r["accuracy"], r["log_loss"]))
+    else:
+        results.sort(key=lambda r: (r["log_loss"], -r["accuracy"]))
+
+    width = {"l2": 10, "lr": 8, "epochs": 6}
+    print(" ".join(f"{k:>{width[k]}}" for k in axes) + f" {'accuracy':>9} {'log_loss':>9}")
+    for r in results:
+        print(" ".join(f"{r[k]:>{width[k]}g}" for k in axes) + f" {r['accuracy']:>9.4f} {r['log_loss']:>9.4f}")
+    if args.results:
+        Path(args.results).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"Wrote results -> {args.results}")
+
+    if args.out:
+        best = {k: results[0][k] for k in axes}
+        D, Y, dropped = tr.prepare_pairs(id2x, tr.iter_pairs(Path(args.pairs)), args.dim)
+        w, b = train_quiet(D, Y, best, base)
+        tr.save_model(Path(args.out), args.feature_version, w, b)
+        print(f"Best {best} retrained on {len(Y)} pairs -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Regression tests for train_ranker.py (stdlib unittest; numpy tests skip without numpy).
+
+  python -m unittest discover -s tools
+"""
+
+import json
+import math
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import train_ranker as tr
+from numpy_support import has_numpy
+
+TOOLS = Path(__file__).resolve().parent
+APPLICANTS = TOOLS / "applicants.jsonl"
+A, B, C = "jd1_2026-01-18T07:08:37.822Z", "jd2_2026-01-18T07:14:28.066Z", "jd3_2026-01-18T07:17:52.813Z"
+
+
+def train(pairs: Path, *extra):
+    """Run train_ranker.py on tools/applicants.jsonl; returns (stdout, model dict)."""
+    out = pairs.with_name("model.json")
+    r = subprocess.run([sys.executable, str(TOOLS / "train_ranker.py"), "--applicants", str(APPLICANTS),
+                        "--pairs", str(pairs), "--out", str(out), "--no-bundle", *extra],
+                       capture_output=True, text=True, check=True)
+    return r.stdout, json.loads(out.read_text(encoding="utf-8"))
+
+
+class NoTrailingNewlineTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_csv_last_row_is_read(self):
+        p = self.dir / "pairs.csv"
+        p.write_text(f"i,j,y\n{A},{B},1\n{B},{C},0", encoding="utf-8")
+        wm = tr.pairs_watermark(p)
+        self.assertEqual(wm["offset"], p.stat().st_size)
+        self.assertEqual(len(list(tr.iter_pairs(p, 0, wm["offset"]))), 2)
+        stdout, model = train(p)
+        self.assertIn("Prepared 2 labeled pairs", stdout)
+        self.assertEqual(model["pairs_watermark"]["offset"], p.stat().st_size)
+
+    def test_jsonl_single_line_is_read(self):
+        p = self.dir / "pairs.jsonl"
+        p.write_text(json.dumps({"i": A, "j": B, "y": 1}), encoding="utf-8")
+        stdout, _ = train(p)
+        self.assertIn("Prepared 1 labeled pairs", stdout)
+
+    def test_incremental_after_unterminated_row(self):
+        p = self.dir / "pairs.csv"
+        p.write_text(f"i,j,y\n{A},{B},1", encoding="utf-8")
+        train(p)
+        base = p.with_name("base.json")
+        p.with_name("model.json").replace(base)
+        with p.open("a", encoding="utf-8") as f:
+            f.write(f"\n{B},{C},0\n")
+        stdout, _ = train(p, "--init-model", str(base), "--incremental")
+        self.assertIn("appended after byte", stdout)
+        self.assertIn("Prepared 1 labeled pairs", stdout)  # the new row only
+
+
+def write_synthetic(d: Path, n_apps=2000, n_pairs=12000, dim=21, seed=0):
+    """applicants.jsonl + pairs.csv with labels drawn from a logistic model on the features."""
+    rng = random.Random(seed)
+    true_w = [rng.gauss(0, 0.5) for _ in range(dim)]
+    X = [[rng.uniform(0, 10) for _ in range(dim)] for _ in range(n_apps)]  # the 0-10 range of real features
+    with (d / "applicants.jsonl").open("w", encoding="utf-8") as f:
+        for a, x in enumerate(X):
+            f.write(json.dumps({"id": f"a{a}", "features": x}) + "\n")
+    with (d / "pairs.csv").open("w", encoding="utf-8") as f:
+        f.write("i,j,y\n")
+        for _ in range(n_pairs):
+            i, j = rng.sample(range(n_apps), 2)
+            s = 0.4 * sum(w * (p - q) for w, p, q in zip(true_w, X[i], X[j]))
+            f.write(f"a{i},a{j},{1 if rng.random() < 1.0 / (1.0 + math.exp(-s)) else 0}\n")
+
+
+def final_avg_loss(applicants: Path, pairs: Path, out: Path, *extra):
+    r = subprocess.run([sys.executable, str(TOOLS / "train_ranker.py"), "--applicants", str(applicants),
+                        "--pairs", str(pairs), "--out", str(out), "--no-bundle", *extra],
+                       capture_output=True, text=True, check=True)
+    return float(re.findall(r"avg_loss=([0-9.]+)", r.stdout)[-1])
+
+
+@unittest.skipUnless(has_numpy(), "needs numpy")
+class NumpyEngineTest(unittest.TestCase):
+    """At the default --lr/--epochs/--batch-size, --engine numpy must do no worse than python SGD."""
+
+    def assertComparable(self, applicants, pairs, out):
+        py = final_avg_loss(applicants, pairs, out)
+        np_ = final_avg_loss(applicants, pairs, out, "--engine", "numpy")
+        self.assertLess(np_, py * 1.1, {"python": py, "numpy": np_})
+
+    def test_repo_pairs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertComparable(APPLICANTS, TOOLS / "pairs.csv", Path(tmp) / "model.json")
+
+    def test_synthetic_pool(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            d = Path(tmp)
+            write_synthetic(d)
+            self.assertComparable(d / "applicants.jsonl", d / "pairs.csv", d / "model.json")
+
+if __name__ == "__main__":
+    unittest.main()